@@ -1,7 +1,30 @@
-from dash import Dash, html, dcc, page_container
+import os
+
+import diskcache
+from dash import Dash, DiskcacheManager, html, dcc, page_container
+
+from tools.cache import CACHE_ROOT
+from tools.metrics import register_metrics_route
+from tools.uploads import register_upload_route
+from tools.warmup import warm_up
+
+# Disk-based job manager: background callbacks parse replays in their own processes
+JOB_CACHE_DIR = os.environ.get("SC2_JOB_CACHE_DIR", os.path.join(CACHE_ROOT, "jobs"))
+background_callback_manager = DiskcacheManager(diskcache.Cache(JOB_CACHE_DIR))
 
 # Dash App
-app = Dash(__name__, use_pages=True)  # Enable pages auto-discovery
+app = Dash(
+    __name__,
+    use_pages=True,  # Enable pages auto-discovery
+    background_callback_manager=background_callback_manager
+)
+register_upload_route(app.server)  # POST /upload: binary replay upload returning a handle
+register_metrics_route(app.server)  # GET /metrics: Prometheus text format
+
+# Pages import the parser and plot code lazily; load and exercise them here, once per
+# worker process before it serves a request, unless SC2_WARMUP=0
+if os.environ.get("SC2_WARMUP", "1") != "0":
+    warm_up()
 
 # Main layout with header bar
 app.layout = html.Div([
@@ -0,0 +1,27 @@
+// Sends files picked in a dcc.Upload to the /upload route as multipart binary and
+// returns their replay handles, so server callbacks never receive base64 payloads.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    uploads: {
+        spool: async function (contents, filenames) {
+            if (!contents) {
+                return null;
+            }
+            const config = JSON.parse(document.getElementById("_dash-config").textContent);
+            const url = config.requests_pathname_prefix + "upload";
+            const multiple = Array.isArray(contents);
+            const files = multiple ? contents : [contents];
+            const names = multiple ? filenames : [filenames];
+            const handles = await Promise.all(files.map(async (dataUri, i) => {
+                const blob = await (await fetch(dataUri)).blob();
+                const form = new FormData();
+                form.append("replay", blob, names[i]);
+                const response = await fetch(url, {method: "POST", body: form});
+                if (!response.ok) {
+                    throw new Error("Upload of " + names[i] + " failed: " + response.status);
+                }
+                return (await response.json()).handle;
+            }));
+            return multiple ? handles : handles[0];
+        }
+    }
+});
@@ -0,0 +1,128 @@
+"""Micro-benchmark of the per-event dispatch overhead in parse_events.
+
+Compares the previous loop (event.name membership test, name branch and
+get_player_name per event) with tools.functions.iter_parse_events, the loop
+parse_events runs, given a copy of its dispatch table with no-op handlers so
+only dispatch cost is measured.
+
+    python -m benchmarks.bench_dispatch [--events 200000] [--repeat 5]
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+import sc2reader
+
+from tools.functions import event_dispatch, initialize_data_structures, iter_parse_events
+from tools.sc2_data import relevant_events, unit_list
+
+
+class _Player:
+    def __init__(self, pid, name, play_race="Terran"):
+        self.pid = pid
+        self.name = name
+        self.play_race = play_race
+
+
+class _Unit:
+    def __init__(self, name, owner):
+        self.name = name
+        self.owner = owner
+
+
+# Event mix roughly matching a real replay: commands and camera/selection noise dominate
+EVENT_MIX = [
+    ("BasicCommandEvent", 30),
+    ("CameraEvent", 25),
+    ("SelectionEvent", 15),
+    ("UnitPositionsEvent", 5),
+    ("UnitBornEvent", 8),
+    ("UnitDiedEvent", 7),
+    ("UnitTypeChangeEvent", 4),
+    ("UnitInitEvent", 3),
+    ("UnitDoneEvent", 2),
+    ("PlayerStatsEvent", 1),
+]
+
+
+def make_events(count, players, seed=0):
+    """Build count bare sc2reader event instances carrying only the attributes dispatch reads."""
+    rnd = random.Random(seed)
+    names, weights = zip(*EVENT_MIX)
+    events = []
+    for i, name in enumerate(rnd.choices(names, weights, k=count)):
+        cls = getattr(sc2reader.events, name)
+        event = cls.__new__(cls)
+        event.name = name
+        event.second = i // 100
+        player = rnd.choice(players)
+        if name in ("UnitBornEvent", "UnitDiedEvent", "UnitTypeChangeEvent", "UnitInitEvent", "UnitDoneEvent"):
+            event.unit = _Unit("Marine", player)
+        else:
+            event.player = player
+        events.append(event)
+    return events
+
+
+def _noop(*args):
+    pass
+
+
+def _get_player_name(event):
+    # Previous player resolution, kept here as the baseline
+    if hasattr(event, 'player') and event.player and hasattr(event.player, 'name'):
+        return str(event.player.name)
+    elif hasattr(event, 'unit') and hasattr(event.unit, 'owner') and event.unit.owner and hasattr(event.unit.owner, 'name'):
+        return str(event.unit.owner.name)
+    return None
+
+
+def legacy_loop(events, player_data):
+    handlers = {name: _noop for name in relevant_events}
+    for event in events:
+        if event.name in relevant_events.keys():
+            handler = handlers[event.name]
+            player_name = _get_player_name(event)
+            if event.name == "PlayerStatsEvent":
+                handler(event, player_data[player_name])
+            else:
+                handler(event, player_data, unit_list.keys())
+
+
+def dispatch_loop(events, players):
+    replay = SimpleNamespace(players=players, events=events)
+    dispatch = {cls: (_noop, resolve) for cls, (_, resolve) in event_dispatch.items()}
+    for _ in iter_parse_events(replay, initialize_data_structures(replay), dispatch=dispatch):
+        pass
+
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    players = [_Player(1, "Player 1"), _Player(2, "Player 2")]
+    events = make_events(args.events, players)
+    player_data = {p.name: {} for p in players}
+
+    before = best_of(args.repeat, legacy_loop, events, player_data)
+    after = best_of(args.repeat, dispatch_loop, events, players)
+    print(f"{args.events} events, best of {args.repeat}")
+    print(f"  name dispatch + get_player_name: {before / args.events * 1e9:8.1f} ns/event")
+    print(f"  iter_parse_events:               {after / args.events * 1e9:8.1f} ns/event")
+    print(f"  speedup: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
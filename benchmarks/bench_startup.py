@@ -0,0 +1,78 @@
+"""Cold start benchmark: app import, warm-up and the first analysis in fresh processes.
+
+    python -m benchmarks.bench_startup [--repeat 5] [--minutes 10] [--players 2]
+
+Each run starts a new interpreter that imports app with SC2_WARMUP=0, optionally
+calls tools.warmup.warm_up, then handles a first analysis: the parser import it
+triggers, parse_events on a synthetic game and every analysis figure encoded to
+JSON. Building the synthetic game is not timed. Reports the best and median of
+--repeat runs; ready is import plus warm-up, what a restarted or newly scaled
+worker spends before serving.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+warm, minutes, players = sys.argv[1] == "1", int(sys.argv[2]), int(sys.argv[3])
+start = time.perf_counter()
+import app
+timings = {"import": time.perf_counter() - start}
+if warm:
+    from tools.warmup import warm_up
+    timings["warm_up"] = warm_up()
+timings["ready"] = time.perf_counter() - start
+
+start = time.perf_counter()
+from tools.functions import FIGURES, build_figure, initialize_data_structures, parse_events
+imported = time.perf_counter() - start
+from benchmarks.synthetic import make_replay
+replay = make_replay(minutes, 150, players)
+start = time.perf_counter()
+player_data = parse_events(replay, initialize_data_structures(replay))
+for name in (*FIGURES, *(f"unit_supply_{i}" for i in range(len(player_data)))):
+    build_figure(player_data, name).to_json()
+timings["first_analysis"] = imported + time.perf_counter() - start
+json.dump(timings, sys.stdout)
+"""
+
+
+def run_child(warm, minutes, players, metrics_dir):
+    """Stage timings (seconds) from one fresh interpreter, recording its metrics in metrics_dir."""
+    env = dict(os.environ, SC2_WARMUP="0", SC2_METRICS_DIR=metrics_dir)
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, "1" if warm else "0", str(minutes), str(players)],
+        cwd=ROOT, env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per configuration")
+    parser.add_argument("--minutes", type=int, default=10, help="Length of the first analysed game")
+    parser.add_argument("--players", type=int, default=2, help="Players in the first analysed game")
+    args = parser.parse_args(argv)
+
+    print(f"{'stage':<32} {'best':>10} {'median':>10}")
+    # The warm-up and figure spans go to a throwaway store, not the production metrics
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        for label, warm in [("no warm-up", False), ("warm-up", True)]:
+            runs = [run_child(warm, args.minutes, args.players, metrics_dir) for _ in range(args.repeat)]
+            for stage in ("import", "warm_up", "ready", "first_analysis"):
+                if stage not in runs[0]:
+                    continue
+                values = [run[stage] for run in runs]
+                print(f"{f'{stage} ({label})':<32} {min(values) * 1e3:>7.0f} ms "
+                      f"{statistics.median(values) * 1e3:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Offline benchmark suite for the parsing and plotting hot paths.
+
+    python -m benchmarks.run [--minutes 10 20 30] [--players 2 4] [--apm 150] [--repeat 3]
+                             [--fixtures DIR] [--save FILE] [--baseline FILE] [--tolerance 0.15]
+
+Games come from benchmarks.synthetic, so no replay files are needed. parse_events
+and the full figure set are timed for every --minutes x --players combination
+(the scaling curves); the individual handlers, update_unit_investment and each
+plot function are timed on the longest game with the fewest players. Replays in
+--fixtures, if the folder exists, are also timed through load_replay and
+parse_events.
+
+Each stage reports the best wall time of --repeat runs and the peak memory traced
+by tracemalloc during one more run. --save writes the results as JSON, and
+--baseline compares against such a file, exiting with status 1 when any stage is
+slower by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import sc2reader
+
+from benchmarks.synthetic import make_replay
+from tools import functions
+from tools.functions import FIGURES, initialize_data_structures, load_replay, parse_events
+from tools.plots import plot_unit_supply
+from tools.sc2_data import unit_ids
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Handlers timed on their own, each over every event of its class in the game
+HANDLERS = {
+    "PlayerStatsEvent": "handle_player_stats",
+    "BasicCommandEvent": "handle_basic_command",
+    "UnitBornEvent": "handle_unit_born",
+    "UnitTypeChangeEvent": "handle_unit_type_change",
+    "UnitInitEvent": "handle_unit_init",
+    "UnitDiedEvent": "handle_unit_died",
+}
+
+
+def measure(run, repeat, setup=None):
+    """Best wall time of repeat calls to run(setup()), then the peak traced memory of one more."""
+    best = float("inf")
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - start)
+    state = setup() if setup else None
+    tracemalloc.start()
+    try:
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def parsed(replay):
+    return parse_events(replay, initialize_data_structures(replay))
+
+
+def build_all_figures(player_data):
+    """Every analysis tab's figure, as build_figure builds them but without its metrics span,
+    so benchmark runs stay out of the production metrics store."""
+    figures = [plot(player_data, {}) if metric else plot(player_data) for plot, metric in FIGURES.values()]
+    figures += [plot_unit_supply(player_data, player_name) for player_name in player_data]
+    return figures
+
+
+def bench_scaling(minutes_list, players_list, apm, repeat):
+    """parse_events and the full figure set across game lengths and player counts."""
+    results = {}
+    for players in players_list:
+        for minutes in minutes_list:
+            replay = make_replay(minutes, apm, players)
+            label = f"{minutes}min,{players}p"
+            result = measure(lambda _: parsed(replay), repeat)
+            result["events"] = len(replay.events)
+            results[f"parse_events[{label}]"] = result
+            player_data = parsed(replay)
+            results[f"figures[{label}]"] = measure(lambda _: build_all_figures(player_data), repeat)
+    return results
+
+
+def bench_handlers(replay, repeat):
+    """Each event handler over its events, and update_unit_investment on its own."""
+    results = {}
+    slots = {player: slot for slot, player in enumerate(replay.players)}
+    resolvers = {cls: resolve for cls, (_, resolve) in functions.event_dispatch.items()}
+
+    def fresh_players():
+        return list(initialize_data_structures(replay).values())
+
+    for class_name, handler_name in HANDLERS.items():
+        cls = getattr(sc2reader.events, class_name)
+        calls = [(event, slots[resolvers[cls](event)]) for event in replay.events if event.__class__ is cls]
+        handler = getattr(functions, handler_name)
+
+        def run(players, handler=handler, calls=calls):
+            for event, slot in calls:
+                handler(event, players, slot)
+
+        result = measure(run, repeat, setup=fresh_players)
+        result["events"] = len(calls)
+        results[f"handler:{handler_name}"] = result
+
+    count = 100_000
+    unit_id = unit_ids["Marine"]
+
+    def run(players):
+        data = players[0]
+        for time_ in range(count):
+            functions.update_unit_investment(data, unit_id, time_, 1)
+
+    result = measure(run, repeat, setup=fresh_players)
+    result["events"] = count
+    results["update_unit_investment"] = result
+    return results
+
+
+def bench_plots(replay, repeat):
+    """Each plot function on one parsed game."""
+    player_data = parsed(replay)
+    results = {}
+    for plot, _ in FIGURES.values():
+        results[f"plot:{plot.__name__}"] = measure(lambda _, plot=plot: plot(player_data), repeat)
+    first_player = next(iter(player_data))
+    results["plot:plot_unit_supply"] = measure(lambda _: plot_unit_supply(player_data, first_player), repeat)
+    return results
+
+
+def bench_fixtures(fixtures_dir, repeat):
+    """load_replay and parse_events on real replay files, if there are any."""
+    results = {}
+    if not os.path.isdir(fixtures_dir):
+        return results
+    for name in sorted(os.listdir(fixtures_dir)):
+        if not name.lower().endswith(".sc2replay"):
+            continue
+        with open(os.path.join(fixtures_dir, name), "rb") as f:
+            replay_bytes = f.read()
+        results[f"fixture:{name}:load_replay"] = measure(lambda _: load_replay(replay_bytes), repeat)
+        replay = load_replay(replay_bytes)
+        result = measure(lambda _: parsed(replay), repeat)
+        result["events"] = len(replay.events)
+        results[f"fixture:{name}:parse_events"] = result
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Per-stage time ratio against baseline results: {stage: (ratio, verdict)}."""
+    comparison = {}
+    for stage, result in results.items():
+        if stage not in baseline:
+            continue
+        ratio = result["seconds"] / baseline[stage]["seconds"]
+        verdict = "slower" if ratio > 1 + tolerance else "faster" if ratio < 1 - tolerance else ""
+        comparison[stage] = (ratio, verdict)
+    return comparison
+
+
+def report(results, comparison, out=sys.stdout):
+    print(f"{'stage':<48} {'time':>10} {'per event':>10} {'peak mem':>10}  {'vs baseline':<12}", file=out)
+    for stage, result in results.items():
+        per_event = f"{result['seconds'] / result['events'] * 1e9:.0f} ns" if result.get("events") else ""
+        line = (f"{stage:<48} {result['seconds'] * 1e3:>7.2f} ms {per_event:>10} "
+                f"{result['peak_bytes'] / 1024:>7.0f} KiB")
+        if stage in comparison:
+            ratio, verdict = comparison[stage]
+            line += f"  {ratio:5.2f}x {verdict}"
+        print(line, file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=int, nargs="+", default=[10, 20, 30], help="Game lengths (game minutes)")
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 4], help="Player counts")
+    parser.add_argument("--apm", type=int, default=150, help="Commands per player per game minute")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage, best is kept")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Folder of .SC2Replay fixtures (default: %(default)s)")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown vs baseline (default: 0.15)")
+    args = parser.parse_args(argv)
+
+    reference = make_replay(max(args.minutes), args.apm, min(args.players))
+    results = {}
+    results.update(bench_scaling(args.minutes, args.players, args.apm, args.repeat))
+    results.update(bench_handlers(reference, args.repeat))
+    results.update(bench_plots(reference, args.repeat))
+    results.update(bench_fixtures(args.fixtures, args.repeat))
+
+    comparison = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            comparison = compare(results, json.load(f)["results"], args.tolerance)
+    report(results, comparison)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "args": {"minutes": args.minutes, "players": args.players, "apm": args.apm, "repeat": args.repeat},
+                "results": results,
+            }, f, indent=2)
+    return 1 if any(verdict == "slower" for _, verdict in comparison.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
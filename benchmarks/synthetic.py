@@ -0,0 +1,148 @@
+"""Synthetic replays for offline benchmarks.
+
+make_replay builds an object with the players and time-ordered events that
+parse_events reads from an sc2reader replay: PlayerStatsEvent samples every 10
+game seconds, BasicCommandEvents at the requested APM (some of them unit
+production), and tracker events for the units produced as real replays have
+them: Zerg units morph Larva -> Egg (UnitTypeChangeEvent) and are born from the
+egg, Protoss warp-ins start with a UnitInitEvent, other units are born
+(UnitBornEvent), some High Templar merge into Archons, and units may die
+(UnitDiedEvent). Each player also starts a building (UnitInitEvent) every
+BUILDING_INTERVAL game seconds.
+"""
+import random
+
+import sc2reader
+
+from tools.sc2_data import morph_to_unit
+
+FRAMES_PER_SECOND = 16  # sc2reader's event.second is frame // 16
+STATS_INTERVAL = 10  # Game seconds between PlayerStatsEvents, as in real replays
+
+# Production commands per race, with relative weights (workers dominate)
+PRODUCTION = {
+    "Terran": [("TrainSCV", 6), ("TrainMarine", 5), ("TrainMarauder", 2), ("BuildSiegeTank", 1),
+               ("BuildMedivac", 1), ("BuildHellion", 1)],
+    "Protoss": [("TrainProbe", 6), ("WarpInZealot", 3), ("WarpInStalker", 4), ("WarpInHighTemplar", 1),
+                ("TrainImmortal", 1), ("TrainColossus", 1), ("TrainObserver", 1)],
+    "Zerg": [("MorphDrone", 6), ("MorphZergling", 5), ("MorphRoach", 3), ("MorphOverlord", 2),
+             ("MorphQueen", 1), ("MorphHydralisk", 1)],
+}
+# Abilities that produce nothing, the bulk of a real command stream
+OTHER_COMMANDS = ["RightClick", "Attack", "Stop", "HoldPosition", "Patrol", "SmartRightClick"]
+WORKERS = {"TrainSCV", "TrainProbe", "MorphDrone"}
+# Buildings started per race, in rotation
+BUILDINGS = {
+    "Terran": ["SupplyDepot", "Barracks", "Refinery", "Factory", "CommandCenter"],
+    "Protoss": ["Pylon", "Gateway", "Assimilator", "CyberneticsCore", "Nexus"],
+    "Zerg": ["SpawningPool", "Extractor", "RoachWarren", "EvolutionChamber", "Hatchery"],
+}
+BUILDING_INTERVAL = 30
+ARCHON_RATE = 0.5  # Share of High Templar merged into an Archon
+
+
+class SyntheticPlayer:
+    def __init__(self, pid, name, play_race):
+        self.pid = pid
+        self.name = name
+        self.play_race = play_race
+
+
+class SyntheticUnit:
+    def __init__(self, name, owner):
+        self.name = name
+        self.owner = owner
+
+
+class SyntheticReplay:
+    """The parts of an sc2reader replay that initialize_data_structures and parse_events read."""
+
+    def __init__(self, players, events):
+        self.players = players
+        self.events = events
+
+
+def _event(name, second, **attributes):
+    """A bare sc2reader event instance carrying only the given attributes."""
+    cls = getattr(sc2reader.events, name)
+    event = cls.__new__(cls)
+    event.name = name
+    event.second = second
+    event.frame = second * FRAMES_PER_SECOND
+    event.__dict__.update(attributes)
+    return event
+
+
+def stats_event(player, second, rnd):
+    """A PlayerStatsEvent with an economy that ramps up over the first ten minutes."""
+    ramp = min(second / 600, 1.0)
+    workers = int(12 + 58 * ramp)
+    army_minerals = int(4000 * ramp * rnd.uniform(0.5, 1.0))
+    army_vespene = army_minerals // 3
+    return _event(
+        "PlayerStatsEvent", second, player=player,
+        minerals_collection_rate=workers * 40 + rnd.randint(-50, 50),
+        minerals_current=rnd.randint(0, 800),
+        minerals_used_current_army=army_minerals,
+        minerals_used_current_economy=workers * 50 + 400,
+        minerals_used_current_technology=int(1500 * ramp),
+        vespene_collection_rate=int(workers * 12 * ramp),
+        vespene_current=rnd.randint(0, 400),
+        vespene_used_current_army=army_vespene,
+        vespene_used_current_economy=int(300 * ramp),
+        vespene_used_current_technology=int(1200 * ramp),
+        workers_active_count=workers,
+        food_made=float(min(200, 15 + int(185 * ramp))),
+        food_used=float(min(200, 12 + int(170 * ramp))),
+    )
+
+
+def make_replay(minutes=15, apm=150, players=2, production_share=0.15, death_rate=0.5, seed=0):
+    """A synthetic game of the given length (game minutes) and players.
+
+    apm is BasicCommandEvents per player per game minute; production_share of them
+    train a unit, which is born 20 game seconds later and dies before the end of
+    the game with probability death_rate (workers half as often).
+    """
+    rnd = random.Random(seed)
+    races = list(PRODUCTION)
+    roster = [
+        SyntheticPlayer(pid, f"Player {pid}", races[(pid - 1) % len(races)]) for pid in range(1, players + 1)
+    ]
+    length = minutes * 60
+    events = []
+    for player in roster:
+        abilities, weights = zip(*PRODUCTION[player.play_race])
+        for second in range(0, length, STATS_INTERVAL):
+            events.append(stats_event(player, second, rnd))
+        buildings = BUILDINGS[player.play_race]
+        for i, second in enumerate(range(BUILDING_INTERVAL, length, BUILDING_INTERVAL)):
+            building = SyntheticUnit(buildings[i % len(buildings)], player)
+            events.append(_event("UnitInitEvent", second, unit=building, unit_type_name=building.name))
+        for _ in range(int(apm * minutes)):
+            second = rnd.randrange(length)
+            if rnd.random() >= production_share:
+                events.append(_event("BasicCommandEvent", second, player=player,
+                                     ability_name=rnd.choice(OTHER_COMMANDS)))
+                continue
+            ability = rnd.choices(abilities, weights)[0]
+            events.append(_event("BasicCommandEvent", second, player=player, ability_name=ability))
+            if player.play_race == "Zerg":
+                larva = SyntheticUnit("Larva", player)
+                events.append(_event("UnitTypeChangeEvent", second, unit=larva, unit_type_name="Egg"))
+            born = second + 20
+            if born >= length:
+                continue
+            unit = SyntheticUnit(morph_to_unit[ability], player)
+            if ability.startswith("WarpIn"):
+                events.append(_event("UnitInitEvent", born, unit=unit, unit_type_name=unit.name))
+            else:
+                events.append(_event("UnitBornEvent", born, unit=unit, unit_type_name=unit.name))
+            if unit.name == "HighTemplar" and born + 20 < length and rnd.random() < ARCHON_RATE:
+                events.append(_event("UnitTypeChangeEvent", born + 20, unit=unit, unit_type_name="Archon"))
+                continue
+            if rnd.random() < (death_rate / 2 if ability in WORKERS else death_rate):
+                events.append(_event("UnitDiedEvent", rnd.randrange(born, length), unit=unit))
+    events.sort(key=lambda event: event.frame)  # sc2reader merges its event streams by frame
+    return SyntheticReplay(roster, events)
+
@@ -1,45 +1,70 @@
 # pages/compare.py
 import dash
-from dash import html, dcc, callback, Input, Output, State
-import sc2reader
-import base64
-import io
-from tools.functions import process_replay
+from dash import html, dcc, callback, clientside_callback, ClientsideFunction, Input, Output, State, ALL
+import uuid
+from functools import lru_cache
+from tools import metrics
+from tools.cache import session_replays
+from tools.uploads import read_upload
 
 dash.register_page(__name__, path="/compare", name="Game Comparison")
 
-layout = html.Div([
-    html.H2("Compare Players Across Replays"),
-    html.Div([
-        html.Div(  # Wrapper to restrict click area
-            dcc.Upload(
-                id="reference-replay",
-                children=html.Button("Select Reference Replay"),
-                multiple=False,
-                accept=".SC2Replay",
+def layout(**kwargs):
+    return html.Div([
+        html.H2("Compare Players Across Replays"),
+        html.Div([
+            html.Div(  # Wrapper to restrict click area
+                dcc.Upload(
+                    id="reference-replay",
+                    children=html.Button("Select Reference Replay"),
+                    multiple=False,
+                    accept=".SC2Replay",
+                ),
+                style={"display": "inline-block", "margin-right": "20px"}
             ),
-            style={"display": "inline-block", "margin-right": "20px"}
-        ),
-        html.Label(id="reference-label", children=""),
-        dcc.Dropdown(id="player-1", placeholder="Select Player 1", style={"width": "300px"})
-    ], style={"margin-bottom": "20px"}),
-    html.Div([
-        html.Div(  # Wrapper to restrict click area
-            dcc.Upload(
-                id="comparison-replay",
-                children=html.Button("Select Comparison Replay"),
-                multiple=False,
-                accept=".SC2Replay",
+            html.Label(id="reference-label", children=""),
+            dcc.Dropdown(id="player-1", placeholder="Select Player 1", style={"width": "300px"})
+        ], style={"margin-bottom": "20px"}),
+        html.Div([
+            html.Div(  # Wrapper to restrict click area
+                dcc.Upload(
+                    id="comparison-replay",
+                    children=html.Button("Select Comparison Replay"),
+                    multiple=False,
+                    accept=".SC2Replay",
+                ),
+                style={"display": "inline-block", "margin-right": "20px"}
             ),
-            style={"display": "inline-block", "margin-right": "20px"}
-        ),
-        html.Label(id="comparison-label", children=""),
-        dcc.Dropdown(id="player-2", placeholder="Select Player 2", style={"width": "300px"})
-    ], style={"margin-bottom": "20px"}),
-    html.Div(id="compare-output", style={"max-height": "80vh", "overflow-y": "auto"}),
-    dcc.Store(id="reference-replay-data"),
-    dcc.Store(id="comparison-replay-data")
-])
+            html.Label(id="comparison-label", children=""),
+            dcc.Dropdown(id="player-2", placeholder="Select Player 2", style={"width": "300px"})
+        ], style={"margin-bottom": "20px"}),
+        html.Div(id="compare-progress", style={"display": "none"}),
+        html.Div("Upload both replays and select players to compare.", id="compare-output", style={"max-height": "80vh", "overflow-y": "auto"}),
+        html.H2("Compare Many Replays"),
+        html.Div([
+            html.Div(  # Wrapper to restrict click area
+                dcc.Upload(
+                    id="multi-replays",
+                    children=html.Button("Select Replays"),
+                    multiple=True,
+                    accept=".SC2Replay",
+                ),
+                style={"display": "inline-block", "margin-right": "20px"}
+            ),
+            html.Div(id="multi-replay-players", style={"margin-top": "10px"})
+        ], style={"margin-bottom": "20px"}),
+        html.Div(id="multi-compare-progress", style={"display": "none"}),
+        html.Div("Upload replays and select a player in at least two of them.", id="multi-compare-output", style={"max-height": "80vh", "overflow-y": "auto"}),
+        # Keys of the compared replays in the server-side store, not the parsed data
+        dcc.Store(id="reference-replay-data"),
+        dcc.Store(id="comparison-replay-data"),
+        # Per-session id and upload handles (content hashes from /upload), which also
+        # key the server-side parsed replay store
+        dcc.Store(id="compare-session", data=str(uuid.uuid4())),
+        dcc.Store(id="reference-replay-key"),
+        dcc.Store(id="comparison-replay-key"),
+        dcc.Store(id="multi-replay-keys")
+    ])
 
 @callback(
     Output("reference-label", "children"),
@@ -59,48 +84,114 @@ def update_comparison_label(filename):
         return f"{filename}"
     return ""
 
+def player_options(handle):
+    """Build dropdown options from the replay header without parsing any events."""
+    from tools.functions import read_replay_metadata  # Imported lazily (see tools.warmup), as below
+
+    try:
+        metadata = read_replay_metadata(read_upload(handle))
+        return [{"label": f"{p['name']} ({p['race']})", "value": p["name"]} for p in metadata["players"]]
+    except Exception:
+        return []
+
+def session_key(session_id, handle):
+    """session_replays key for an upload; the parser version keeps stale layouts from being read."""
+    from tools.functions import PARSER_VERSION
+
+    return (session_id, handle, PARSER_VERSION)
+
+def session_replay(session_id, handle):
+    """Return parsed player_data for an upload, parsing it only once per session."""
+    from tools.functions import process_replay
+
+    store_key = session_key(session_id, handle)
+    player_data = session_replays.get(store_key)
+    if player_data is None:
+        player_data = process_replay(read_upload(handle))
+        session_replays.put(store_key, player_data)
+    return player_data
+
+# The browser posts each file to /upload as binary; only handles reach server callbacks
+for upload_id, handle_id in [("reference-replay", "reference-replay-key"),
+                             ("comparison-replay", "comparison-replay-key"),
+                             ("multi-replays", "multi-replay-keys")]:
+    clientside_callback(
+        ClientsideFunction(namespace="uploads", function_name="spool"),
+        Output(handle_id, "data"),
+        Input(upload_id, "contents"),
+        State(upload_id, "filename")
+    )
+
 @callback(
     Output("player-1", "options"),
-    Input("reference-replay", "contents")
+    Input("reference-replay-key", "data")
 )
-def update_player_1_dropdown(contents):
-    if not contents:
-        return []
-    try:
-        content_type, content_string = contents.split(',')
-        replay_bytes = base64.b64decode(content_string)
-        replay = sc2reader.load_replay(io.BytesIO(replay_bytes))
-        return [{"label": p.name, "value": p.name} for p in replay.players]
-    except Exception:
+def update_player_1_dropdown(handle):
+    if not handle:
         return []
+    return player_options(handle)
 
 @callback(
     Output("player-2", "options"),
-    Input("comparison-replay", "contents")
+    Input("comparison-replay-key", "data")
 )
-def update_player_2_dropdown(contents):
-    if not contents:
-        return []
-    try:
-        content_type, content_string = contents.split(',')
-        replay_bytes = base64.b64decode(content_string)
-        replay = sc2reader.load_replay(io.BytesIO(replay_bytes))
-        return [{"label": p.name, "value": p.name} for p in replay.players]
-    except Exception:
+def update_player_2_dropdown(handle):
+    if not handle:
         return []
+    return player_options(handle)
 
 @callback(
     [Output("compare-output", "children"),
      Output("reference-replay-data", "data"),
      Output("comparison-replay-data", "data")],
-    [Input("reference-replay", "contents"),
-     Input("comparison-replay", "contents"),
+    [Input("reference-replay-key", "data"),
+     Input("comparison-replay-key", "data"),
      Input("player-1", "value"),
-     Input("player-2", "value")]
+     Input("player-2", "value")],
+    State("compare-session", "data"),
+    background=True,
+    progress=Output("compare-progress", "children"),
+    running=[(Output("compare-progress", "style"), {"display": "block", "margin-bottom": "10px"}, {"display": "none"})],
+    prevent_initial_call=True
 )
 
-def compare_players(contents_1, contents_2, player_1, player_2):
+def compare_players(set_progress, key_1, key_2, player_1, player_2, session_id):
+    if not all([key_1, key_2, player_1, player_2]):
+        return html.Div("Upload both replays and select players to compare."), None, None
+
+    try:
+        with metrics.span("callback:compare_players"):
+            # Parsed once per upload, re-selecting a player only rebuilds the figures
+            set_progress("Parsing reference replay...")
+            player_data_1 = session_replay(session_id, key_1)  # Reference
+            set_progress("Parsing comparison replay...")
+            player_data_2 = session_replay(session_id, key_2)  # Comparison
+            set_progress("Building charts...")
+
+            # Validate selected players
+            if player_1 not in player_data_1 or player_2 not in player_data_2:
+                return html.Div("Selected players not found in replays."), None, None
+
+            # Tag players with replay identifier
+            tagged_player_1 = f"Reference - {player_1}"
+            tagged_player_2 = f"Comparison - {player_2}"
+
+            # Combine data with tagged player names
+            compare_data = {
+                tagged_player_1: player_data_1[player_1],
+                tagged_player_2: player_data_2[player_2]
+            }
+
+            graphs = comparison_graphs(compare_data, [key_1, key_2], "compare")
+            return graphs, [session_id, key_1], [session_id, key_2]
+    except Exception as e:
+        return html.Div(f"Error: {str(e)}"), None, None
+
+def comparison_graphs(compare_data, replay_keys, id_prefix):
+    """Build every comparison chart for already tagged player data, from replay_keys uploads."""
+    from tools.functions import figure_key
     from tools.plots import (
+        cached_figure,
         plot_collection_rates,
         plot_workers_active,
         plot_income_advantage,
@@ -108,62 +199,94 @@ def compare_players(contents_1, contents_2, player_1, player_2):
         plot_army_value,
         plot_tech_value,
         plot_supply,
-        plot_unit_supply
+        plot_unit_supply,
+        unit_supply_grid
     )
 
-    if not all([contents_1, contents_2, player_1, player_2]):
-        return html.Div("Upload both replays and select players to compare."), None, None
+    # Generate comparison graphs, each built only if not already in the figure cache
+    shared_grid = lru_cache(maxsize=None)(lambda: unit_supply_grid(compare_data))
+    builders = {
+        "collection-rates": lambda: plot_collection_rates(compare_data),
+        "workers-active": lambda: plot_workers_active(compare_data),
+        "income-advantage": lambda: plot_income_advantage(compare_data),
+        "resources-available": lambda: plot_resources_available(compare_data),
+        "army-value": lambda: plot_army_value(compare_data),
+        "tech-value": lambda: plot_tech_value(compare_data),
+        "supply": lambda: plot_supply(compare_data),
+    }
+    for i, tagged_player in enumerate(compare_data):
+        builders[f"unit-supply-{i}"] = lambda player=tagged_player: plot_unit_supply(
+            compare_data, player, shared_grid()
+        )
+    figures = {
+        name: cached_figure(figure_key(replay_keys, name, compare_data), build)
+        for name, build in builders.items()
+    }
+
+    graphs = [
+        dcc.Graph(id=f"{id_prefix}-{name}", figure=figure, style={"margin-bottom": "20px"})
+        for name, figure in figures.items()
+    ]
+    return html.Div(graphs, style={"width": "100%", "display": "flex", "flex-direction": "column"})
+
+
+# Multi-replay comparison: any number of uploads, one player picked per replay
+@callback(
+    Output("multi-replay-players", "children"),
+    Input("multi-replay-keys", "data"),
+    State("multi-replays", "filename")
+)
+def update_multi_replay_players(keys, filenames):
+    if not keys:
+        return []
+    rows = []
+    for i, (key, filename) in enumerate(zip(keys, filenames)):
+        options = player_options(key)
+        rows.append(html.Div([
+            html.Label(filename, style={"display": "inline-block", "width": "300px"}),
+            dcc.Dropdown(
+                id={"type": "multi-player", "index": i},
+                options=options,
+                placeholder="Select Player",
+                style={"width": "300px", "display": "inline-block"}
+            )
+        ], style={"margin-bottom": "10px"}))
+    return rows
+
+@callback(
+    Output("multi-compare-output", "children"),
+    [Input("multi-replay-keys", "data"),
+     Input({"type": "multi-player", "index": ALL}, "value")],
+    [State("multi-replays", "filename"),
+     State("compare-session", "data")],
+    background=True,
+    progress=Output("multi-compare-progress", "children"),
+    running=[(Output("multi-compare-progress", "style"), {"display": "block", "margin-bottom": "10px"}, {"display": "none"})],
+    prevent_initial_call=True
+)
+def compare_many_players(set_progress, keys, players, filenames, session_id):
+    selected = [i for i, player in enumerate(players) if player]
+    if not keys or len(selected) < 2:
+        return html.Div("Upload replays and select a player in at least two of them.")
+    from tools.functions import process_replays
 
     try:
-        # Process Replay 1 (Reference)
-        content_type, content_string = contents_1.split(',')
-        replay_bytes_1 = base64.b64decode(content_string)
-        player_data_1 = process_replay(replay_bytes_1)
-
-        # Process Replay 2 (Comparison)
-        content_type, content_string = contents_2.split(',')
-        replay_bytes_2 = base64.b64decode(content_string)
-        player_data_2 = process_replay(replay_bytes_2)
-
-        # Validate selected players
-        if player_1 not in player_data_1 or player_2 not in player_data_2:
-            return html.Div("Selected players not found in replays."), None, None
-
-        # Tag players with replay identifier
-        tagged_player_1 = f"Reference - {player_1}"
-        tagged_player_2 = f"Comparison - {player_2}"
-
-        # Combine data with tagged player names
-        compare_data = {
-            tagged_player_1: player_data_1[player_1],
-            tagged_player_2: player_data_2[player_2]
-        }
-
-        # Generate comparison graphs
-        figures = {
-            "collection_rates": plot_collection_rates(compare_data),
-            "workers_active": plot_workers_active(compare_data),
-            "income_advantage": plot_income_advantage(compare_data),
-            "resources_available": plot_resources_available(compare_data),
-            "army_value": plot_army_value(compare_data),
-            "tech_value": plot_tech_value(compare_data),
-            "supply": plot_supply(compare_data),
-            f"unit_supply_0": plot_unit_supply(compare_data, tagged_player_1),
-            f"unit_supply_1": plot_unit_supply(compare_data, tagged_player_2)
-        }
-
-        graphs = [
-            dcc.Graph(id="compare-collection-rates", figure=figures["collection_rates"], style={"margin-bottom": "20px"}),
-            dcc.Graph(id="compare-workers-active", figure=figures["workers_active"], style={"margin-bottom": "20px"}),
-            dcc.Graph(id="compare-income-advantage", figure=figures["income_advantage"], style={"margin-bottom": "20px"}),
-            dcc.Graph(id="compare-resources-available", figure=figures["resources_available"], style={"margin-bottom": "20px"}),
-            dcc.Graph(id="compare-army-value", figure=figures["army_value"], style={"margin-bottom": "20px"}),
-            dcc.Graph(id="compare-tech-value", figure=figures["tech_value"], style={"margin-bottom": "20px"}),
-            dcc.Graph(id="compare-supply", figure=figures["supply"], style={"margin-bottom": "20px"}),
-            dcc.Graph(id="compare-unit-supply-0", figure=figures["unit_supply_0"], style={"margin-bottom": "20px"}),
-            dcc.Graph(id="compare-unit-supply-1", figure=figures["unit_supply_1"], style={"margin-bottom": "20px"})
-        ]
-
-        return html.Div(graphs, style={"width": "100%", "display": "flex", "flex-direction": "column"}), player_data_1, player_data_2
+        with metrics.span("callback:compare_many_players"):
+            # Parse every selected replay not yet in the session store concurrently
+            parsed = {i: session_replays.get(session_key(session_id, keys[i])) for i in selected}
+            missing = [i for i in selected if parsed[i] is None]
+            set_progress(f"Parsing {len(missing)} replays...")
+            replays_bytes = [read_upload(keys[i]) for i in missing]
+            for i, player_data in zip(missing, process_replays(replays_bytes)):
+                session_replays.put(session_key(session_id, keys[i]), player_data)
+                parsed[i] = player_data
+
+            compare_data = {}
+            for i in selected:
+                if players[i] not in parsed[i]:
+                    return html.Div(f"{players[i]} not found in {filenames[i]}.")
+                compare_data[f"{i + 1}. {players[i]} ({filenames[i]})"] = parsed[i][players[i]]
+            set_progress("Building charts...")
+            return comparison_graphs(compare_data, [keys[i] for i in selected], "multi-compare")
     except Exception as e:
-        return html.Div(f"Error: {str(e)}"), None, None
\ No newline at end of file
+        return html.Div(f"Error: {str(e)}")
@@ -1,9 +1,21 @@
-from dash import register_page, html, dcc, callback, Input, Output
-import base64
-from tools.functions import main  # Import main from app.py
+from dash import register_page, html, dcc, callback, clientside_callback, ClientsideFunction, Input, Output, State
+from tools import metrics
+from tools.cache import session_replays
+from tools.uploads import read_upload
 
 register_page(__name__, path="/analyze", name="Game Analysis")
 
+# Tab per overview figure (tools.functions.FIGURES), plus one unit supply tab per player
+FIGURE_TABS = [
+    ("collection_rates", "Collection Rates"),
+    ("workers_active", "Workers"),
+    ("income_advantage", "Income Advantage"),
+    ("resources_available", "Resources"),
+    ("army_value", "Army Value"),
+    ("tech_value", "Upgrades"),
+    ("supply", "Supply"),
+]
+
 layout = html.Div([
     html.H2("Examine a Replay in detail"),
     dcc.Upload(
@@ -12,36 +24,153 @@ layout = html.Div([
         multiple=False,
         accept=".SC2Replay"
     ),
-    html.Div(id="graph-output", style={"max-height": "80vh", "overflow-y": "auto"})
+    html.Div([
+        html.Span(id="analysis-progress", style={"margin-right": "20px"}),
+        html.Button("Cancel", id="cancel-analysis", disabled=True)
+    ], id="analysis-status", style={"display": "none"}),
+    dcc.Checklist(
+        id="benchmark-bands",
+        options=[{"label": " Overlay corpus percentile bands (same race and matchup)", "value": "bands"}],
+        value=[],
+        style={"margin": "10px 0"}
+    ),
+    dcc.Checklist(
+        id="parser-diagnostics",
+        options=[{"label": " Show parser diagnostics (re-parses the replay with per-handler timing)", "value": "show"}],
+        value=[],
+        style={"margin": "10px 0"}
+    ),
+    html.Div(id="diagnostics-panel"),
+    html.Div("Upload a replay file to generate the graphs.", id="graph-output"),
+    # Only the selected tab's figure is built, by render_figure
+    html.Div([
+        dcc.Tabs(id="analysis-tabs", value=FIGURE_TABS[0][0]),
+        dcc.Loading(dcc.Graph(id="analysis-graph"))
+    ], id="analysis-figures", style={"display": "none"}),
+    dcc.Store(id="replay-handle"),  # Content hash of the replay spooled through /upload
+    dcc.Store(id="analysis-replay")  # Handle and player names once the replay is parsed
 ])
 
+# The browser posts the file to /upload as binary; only the handle reaches server callbacks
+clientside_callback(
+    ClientsideFunction(namespace="uploads", function_name="spool"),
+    Output("replay-handle", "data"),
+    Input("upload-replay", "contents"),
+    State("upload-replay", "filename")
+)
+
+# Progress text shown for each stage reported by process_replay()
+PROGRESS_STAGES = {
+    "load": "Loading replay...",
+    "parse": "Parsing events...",
+}
+
+def analysis_replay(handle, progress=None):
+    """Parsed player_data for an upload, kept in the shared server-side store."""
+    from tools.functions import PARSER_VERSION, process_replay  # Imported lazily (see tools.warmup), as below
+
+    store_key = ("analysis", handle, PARSER_VERSION)  # Entries from an older parser are never read
+    player_data = session_replays.get(store_key)
+    if player_data is None:
+        player_data = process_replay(read_upload(handle), progress=progress)
+        session_replays.put(store_key, player_data)
+    return player_data
+
+# Runs as a background job; a new upload replaces (and cancels) the running one
+@callback(
+    [Output("graph-output", "children"),
+     Output("analysis-tabs", "children"),
+     Output("analysis-tabs", "value"),
+     Output("analysis-figures", "style"),
+     Output("analysis-replay", "data")],
+    Input("replay-handle", "data"),
+    background=True,
+    progress=Output("analysis-progress", "children"),
+    running=[
+        (Output("analysis-status", "style"), {"display": "block", "margin": "10px 0"}, {"display": "none"}),
+        (Output("cancel-analysis", "disabled"), False, True),
+    ],
+    cancel=Input("cancel-analysis", "n_clicks"),
+    prevent_initial_call=True
+)
+def parse_upload(set_progress, handle):
+    hidden = {"display": "none"}
+    if not handle:
+        return "Upload a replay file to generate the graphs.", [], FIGURE_TABS[0][0], hidden, None
+    try:
+        with metrics.span("callback:parse_upload"):
+            player_data = analysis_replay(handle, progress=lambda stage: set_progress(PROGRESS_STAGES[stage]))
+            players = list(player_data)
+            tabs = [dcc.Tab(label=label, value=name) for name, label in FIGURE_TABS]
+            tabs += [dcc.Tab(label=f"Units - {player}", value=f"unit_supply_{i}") for i, player in enumerate(players)]
+            return None, tabs, FIGURE_TABS[0][0], {"display": "block"}, {"handle": handle, "players": players}
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        return html.Div(f"Error: {str(e)}\n\nDetails:\n{error_details}", style={"white-space": "pre-wrap"}), [], FIGURE_TABS[0][0], hidden, None
+
+@callback(
+    Output("analysis-graph", "figure"),
+    Input("analysis-tabs", "value"),
+    Input("analysis-replay", "data"),
+    Input("benchmark-bands", "value"),
+    prevent_initial_call=True
+)
+def render_figure(name, replay, show_bands):
+    if not replay or not name:
+        return {}
+    from tools.aggregates import cached_index
+    from tools.functions import build_figure, figure_key
+    from tools.plots import cached_figure
+
+    with metrics.span("callback:render_figure"):
+        index = cached_index() if show_bands else None
+        key = figure_key([replay["handle"]], name, replay["players"], index)
+        return cached_figure(key, lambda: build_figure(analysis_replay(replay["handle"]), name, index))
+
+
+def table(header, rows):
+    cell = {"padding": "2px 12px", "text-align": "right"}
+    return html.Table([
+        html.Thead(html.Tr([html.Th(h, style=cell) for h in header])),
+        html.Tbody([html.Tr([html.Td(value, style=cell) for value in row]) for row in rows])
+    ], style={"margin-bottom": "10px", "border-collapse": "collapse"})
+
+def diagnostics_panel(profile):
+    """Render a parse_events profile (see tools.functions.profile_events)."""
+    handlers = sorted(profile["handlers"].items(), key=lambda item: item[1]["total_seconds"], reverse=True)
+    return html.Div([
+        html.H4("Parser diagnostics"),
+        html.P(f"{profile['events']} events in {profile['seconds'] * 1e3:.1f} ms "
+               f"({profile['events_per_second']:,.0f} events/s)"),
+        table(
+            ["Handler", "Calls", "Total ms", "Mean µs", "Max µs"],
+            [[name, stats["calls"], f"{stats['total_seconds'] * 1e3:.2f}",
+              f"{stats['total_seconds'] / stats['calls'] * 1e6:.1f}", f"{stats['max_seconds'] * 1e6:.1f}"]
+             for name, stats in handlers]
+        ),
+        table(
+            ["Event type", "Seen", "Dispatched", "Dropped", "Unhandled"],
+            [[name, counts["seen"], counts["dispatched"], counts["dropped"], counts["unhandled"]]
+             for name, counts in profile["event_types"].items()]
+        ),
+    ], style={"margin": "10px 0", "font-size": "14px"})
+
 @callback(
-    Output("graph-output", "children"),
-    Input("upload-replay", "contents")
+    Output("diagnostics-panel", "children"),
+    Input("parser-diagnostics", "value"),
+    Input("analysis-replay", "data"),
+    background=True,
+    prevent_initial_call=True
 )
-def update_graph(contents):
-    if contents:
-        try:
-            content_type, content_string = contents.split(',')
-            replay_bytes = base64.b64decode(content_string)
-            figures = main(replay_bytes)
-            graphs = [
-                dcc.Graph(id="collection-rates-graph", figure=figures["collection_rates"], style={"margin-bottom": "20px"}),
-                dcc.Graph(id="workers-active-graph", figure=figures["workers_active"], style={"margin-bottom": "20px"}),
-                dcc.Graph(id="income-advantage-graph", figure=figures["income_advantage"], style={"margin-bottom": "20px"}),
-                dcc.Graph(id="resources-available-graph", figure=figures["resources_available"], style={"margin-bottom": "20px"}),
-                dcc.Graph(id="army-value-graph", figure=figures["army_value"], style={"margin-bottom": "20px"}),
-                dcc.Graph(id="tech-value-graph", figure=figures["tech_value"], style={"margin-bottom": "20px"}),
-                dcc.Graph(id="supply-graph", figure=figures["supply"], style={"margin-bottom": "20px"}),
-            ]
-            for i in range(len(figures) - len(graphs)):
-                graphs.append(
-                    dcc.Graph(id=f"unit-supply-graph-{i}", figure=figures[f"unit_supply_{i}"], style={"margin-bottom": "20px"})
-                )
-            return html.Div(graphs, style={"width": "100%", "display": "flex", "flex-direction": "column"})
-        except Exception as e:
-            import traceback
-            error_details = traceback.format_exc()
-            return html.Div(f"Error: {str(e)}\n\nDetails:\n{error_details}", style={"white-space": "pre-wrap"})
-    return html.Div("Upload a replay file to generate the graphs.")
+def update_diagnostics(show, replay):
+    if not show or not replay:
+        return None
+    from tools.functions import process_replay
 
+    try:
+        with metrics.span("callback:update_diagnostics"):
+            _, profile = process_replay(read_upload(replay["handle"]), profile=True)
+            return diagnostics_panel(profile)
+    except Exception as e:
+        return html.Div(f"Error: {str(e)}")
@@ -0,0 +1,19 @@
+from benchmarks.synthetic import make_replay
+from tools.functions import initialize_data_structures, parse_events
+from tools.plots import WEBGL_MIN_POINTS, line_trace, plot_supply
+
+
+def trace_types(minutes):
+    replay = make_replay(minutes, 150, 2, seed=0)
+    player_data = parse_events(replay, initialize_data_structures(replay))
+    return {trace.type for trace in plot_supply(player_data).data}
+
+
+def test_line_trace_switches_to_webgl_above_threshold():
+    assert line_trace(range(WEBGL_MIN_POINTS), range(WEBGL_MIN_POINTS)).type == "scatter"
+    assert line_trace(range(WEBGL_MIN_POINTS + 1), range(WEBGL_MIN_POINTS + 1)).type == "scattergl"
+
+
+def test_long_game_is_drawn_with_webgl():
+    assert trace_types(15) == {"scatter"}
+    assert trace_types(60) == {"scattergl"}
@@ -0,0 +1,182 @@
+"""Corpus percentile index for benchmark bands on the single-replay charts.
+
+    python -m tools.aggregates build [--store DIR] [--index FILE]
+
+For each (race, matchup, metric) the index holds a histogram of sample values per
+real-time minute. Histograms use fixed bin edges, so merging new replays is a plain
+addition and a band lookup is one dict access plus a cumulative sum.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from tools.cache import CACHE_ROOT
+from tools.replay_store import STORE_DIR, iter_replays
+from tools.timeline import game_to_real_minutes
+
+INDEX_PATH = os.environ.get("SC2_AGGREGATE_INDEX", os.path.join(CACHE_ROOT, "aggregates.npz"))
+
+MAX_MINUTES = 60  # Samples past this real minute go in the last bin
+MIN_SAMPLES = 5  # Minute bins with fewer samples have no band
+
+# Metric -> (series from one player's data, histogram bin width, number of bins)
+METRICS = {
+    "collection_rate": (lambda d: d["minerals_collection_rate"] + d["vespene_collection_rate"], 50, 200),
+    "workers_active": (lambda d: d["workers_active_count"], 1, 120),
+    "resources_available": (lambda d: d["minerals_current"] + d["vespene_current"], 50, 200),
+    "army_value": (lambda d: d["army_value"], 100, 300),
+    "tech_value": (lambda d: d["minerals_used_current_technology"] + d["vespene_used_current_technology"], 50, 200),
+    "supply": (lambda d: d["food_used"], 1, 201),
+}
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def matchup(race, opponent_race):
+    """Matchup label from the player's perspective, e.g. TvZ."""
+    return f"{race[:1]}v{opponent_race[:1]}"
+
+
+def empty_index():
+    # replays: keys added to the counts; skipped: keys seen but not 1v1, so never added
+    return {"replays": set(), "skipped": set(), "counts": {}}
+
+
+def add_replay(index, key, player_data):
+    """Add one 1v1 replay's samples to the index. Returns False if skipped."""
+    if key in index["replays"] or key in index["skipped"]:
+        return False
+    if len(player_data) != 2:
+        index["skipped"].add(key)  # Remembered so later builds do not read it again
+        return False
+    (name_1, data_1), (name_2, data_2) = player_data.items()
+    for data, opponent in ((data_1, data_2), (data_2, data_1)):
+        if not data.get("race") or not opponent.get("race"):
+            continue
+        minutes = np.minimum(game_to_real_minutes(data["times"]).astype(np.intp), MAX_MINUTES - 1)
+        for metric, (series, width, bins) in METRICS.items():
+            values = np.minimum(np.asarray(series(data)) // width, bins - 1).astype(np.intp)
+            hist_key = (data["race"], matchup(data["race"], opponent["race"]), metric)
+            counts = index["counts"].get(hist_key)
+            if counts is None:
+                counts = index["counts"][hist_key] = np.zeros((MAX_MINUTES, bins), dtype=np.int64)
+            np.add.at(counts, (minutes, np.maximum(values, 0)), 1)
+    index["replays"].add(key)
+    return True
+
+
+def merge(index, other):
+    """Merge an index built from a disjoint set of replays into index."""
+    if index["replays"] & other["replays"]:
+        raise ValueError("Indexes share replays; rebuild instead of merging overlapping corpora")
+    for hist_key, counts in other["counts"].items():
+        if hist_key in index["counts"]:
+            index["counts"][hist_key] += counts
+        else:
+            index["counts"][hist_key] = counts.copy()
+    index["replays"] |= other["replays"]
+    index["skipped"] |= other["skipped"]
+    return index
+
+
+def band(index, race, matchup_label, metric):
+    """Percentile band (minutes, p25, p50, p75) for one race/matchup/metric, or None."""
+    counts = index["counts"].get((race, matchup_label, metric))
+    if counts is None:
+        return None
+    _, width, bins = METRICS[metric]
+    totals = counts.sum(axis=1)
+    keep = totals >= MIN_SAMPLES
+    if not keep.any():
+        return None
+    cumulative = np.cumsum(counts[keep], axis=1)
+    result = {"minutes": np.arange(MAX_MINUTES)[keep] + 0.5}
+    for q in QUANTILES:
+        # First bin whose cumulative count reaches the quantile, reported at the bin center
+        idx = (cumulative < (q * totals[keep])[:, None]).sum(axis=1)
+        result[f"p{round(q * 100)}"] = (np.minimum(idx, bins - 1) + 0.5) * width
+    return result
+
+
+def player_bands(index, player_data):
+    """Bands for every metric and player of a replay: {metric: {player_name: band}}."""
+    bands = {metric: {} for metric in METRICS}
+    if index is None or len(player_data) != 2:
+        return bands
+    (name_1, data_1), (name_2, data_2) = player_data.items()
+    for name, data, opponent in ((name_1, data_1, data_2), (name_2, data_2, data_1)):
+        if not data.get("race") or not opponent.get("race"):
+            continue
+        label = matchup(data["race"], opponent["race"])
+        for metric in METRICS:
+            player_band = band(index, data["race"], label, metric)
+            if player_band is not None:
+                bands[metric][name] = player_band
+    return bands
+
+
+def save_index(index, path=INDEX_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    arrays = {"|".join(hist_key): counts for hist_key, counts in index["counts"].items()}
+    arrays["meta"] = np.array(json.dumps({"replays": sorted(index["replays"]), "skipped": sorted(index["skipped"])}))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_index(path=INDEX_PATH):
+    """Load a saved index, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    index = empty_index()
+    with np.load(path) as npz:
+        for name in npz.files:
+            if name == "meta":
+                meta = json.loads(str(npz["meta"]))
+                index["replays"] = set(meta["replays"])
+                index["skipped"] = set(meta.get("skipped", ()))  # Absent from indexes saved before it existed
+            else:
+                index["counts"][tuple(name.split("|"))] = npz[name]
+    return index
+
+
+_loaded = {}
+
+def cached_index(path=INDEX_PATH):
+    """load_index, reloaded only when the file changes on disk."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _loaded.get(path, (None, None))[0] != mtime:
+        _loaded[path] = (mtime, load_index(path))
+    return _loaded[path][1]
+
+
+def build(store_dir=STORE_DIR, path=INDEX_PATH):
+    """Add every stored replay the index at path has not seen yet, then save it."""
+    index = load_index(path) or empty_index()
+    added = 0
+    # Replays already in the index, or skipped as not 1v1, are passed over by file name before they are read
+    for meta, player_data in iter_replays(store_dir, skip=index["replays"] | index["skipped"], unit_log=False):
+        added += add_replay(index, meta["key"], player_data)
+    save_index(index, path)
+    return added, len(index["replays"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Incrementally add stored replays to the index")
+    build_parser.add_argument("--store", default=STORE_DIR, help="Replay store directory (default: %(default)s)")
+    build_parser.add_argument("--index", default=INDEX_PATH, help="Index file (default: %(default)s)")
+    args = parser.parse_args(argv)
+    added, total = build(args.store, args.index)
+    print(f"Added {added} replays, index now covers {total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import pickle
+import threading
+import zlib
+
+import diskcache
+
+# Root of every on-disk cache and store; each also has its own override
+CACHE_ROOT = os.environ.get(
+    "SC2_CACHE_ROOT",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"),
+)
+
+# On-disk cache location and size budget (override through the environment)
+CACHE_DIR = os.environ.get("SC2_CACHE_DIR", os.path.join(CACHE_ROOT, "replays"))
+CACHE_MAX_BYTES = int(os.environ.get("SC2_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+
+def replay_hash(replay_bytes):
+    """Content hash identifying a replay file."""
+    return hashlib.sha256(replay_bytes).hexdigest()
+
+
+def evict_lru(directory, suffix, max_bytes):
+    """Delete the least recently used files named *suffix in directory, by mtime, until they fit in max_bytes.
+
+    Safe to run from several processes at once. Returns the number of files deleted.
+    """
+    entries = []
+    total = 0
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.endswith(suffix):
+                try:
+                    st = entry.stat()
+                except OSError:  # Removed by another process since the scan
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+    entries.sort()
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+        total -= size
+    return removed
+
+
+class ReplayCache:
+    """Size-bounded LRU cache of parsed player_data, stored as compressed pickles on disk."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl.z")
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        except Exception:
+            # Corrupt or unreadable entry, drop it and treat as a miss
+            self.stats["errors"] += 1
+            self.stats["misses"] += 1
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # Bump mtime so eviction sees this entry as recently used
+        except OSError:  # Evicted by another process since it was read
+            pass
+        self.stats["hits"] += 1
+        return value
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def put(self, key, value):
+        """Store value under key, then evict least recently used entries over budget."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        payload = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # Unique per writer
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)  # Atomic, readers never see a partial entry
+        self.stats["writes"] += 1
+        self.evict()
+
+    def evict(self):
+        """Delete the oldest entries until the cache fits in max_bytes."""
+        self.stats["evictions"] += evict_lru(self.cache_dir, ".pkl.z", self.max_bytes)
+
+    def clear(self):
+        """Remove every cached entry."""
+        if os.path.isdir(self.cache_dir):
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".pkl.z"):
+                        self._remove(entry.path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class SharedStore:
+    """LRU store on diskcache, shared between the server and its background job processes.
+
+    With a ttl (seconds), entries expire after that long without being read.
+    """
+
+    def __init__(self, directory, size_limit, ttl=None):
+        self._cache = diskcache.Cache(
+            directory, size_limit=size_limit, eviction_policy="least-recently-used"
+        )
+        self._cache.stats(enable=True)
+        self.ttl = ttl
+
+    @property
+    def stats(self):
+        hits, misses = self._cache.stats()
+        return {"hits": hits, "misses": misses}
+
+    def get(self, key):
+        """Return the stored value for key, or None on a miss."""
+        value = self._cache.get(key)
+        if value is not None and self.ttl is not None:
+            self._cache.touch(key, expire=self.ttl)
+        return value
+
+    def put(self, key, value):
+        self._cache.set(key, value, expire=self.ttl)
+
+    def __len__(self):
+        return len(self._cache)
+
+
+# Shared cache used by process_replay
+replay_cache = ReplayCache()
+
+# Parsed replays keyed by (session id, replay hash). Lives on disk so background
+# callbacks, which run in their own processes, see what the others parsed. Pages
+# keep only these keys in the browser; idle entries expire after SC2_SESSION_TTL_S.
+session_replays = SharedStore(
+    os.path.join(CACHE_ROOT, "sessions"),
+    size_limit=int(os.environ.get("SC2_SESSION_STORE_MB", "1024")) * 1024 * 1024,
+    ttl=int(os.environ.get("SC2_SESSION_TTL_S", str(2 * 60 * 60))),
+)
+
+# Serialized figure JSON keyed by tools.functions.figure_key, shared like session_replays
+figure_cache = SharedStore(
+    os.path.join(CACHE_ROOT, "figures"),
+    size_limit=int(os.environ.get("SC2_FIGURE_CACHE_MB", "256")) * 1024 * 1024,
+)
@@ -1,8 +1,22 @@
 import sc2reader
 import base64
 import io
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from operator import attrgetter
+from sc2reader.engine import GameEngine
+from sc2reader.engine.plugins import ContextLoader
 
-from tools.sc2_data import costs, morph_to_unit, unit_list, relevant_events
+from tools.aggregates import player_bands
+from tools import metrics
+from tools.cache import replay_cache, replay_hash
+from tools.timeline import PlayerTimeline, UnitLog
+from tools.sc2_data import ability_unit_ids, unit_ids, unit_supply, relevant_events
 from tools.plots import (
     plot_collection_rates,
     plot_workers_active,
@@ -14,26 +28,188 @@ from tools.plots import (
     plot_unit_supply
 )
 
+# Overview figures by name: (plot function, tools.aggregates metric for its corpus band or None).
+# Per-player unit supply figures are named unit_supply_<player index>.
+FIGURES = {
+    "collection_rates": (plot_collection_rates, "collection_rate"),
+    "workers_active": (plot_workers_active, "workers_active"),
+    "income_advantage": (plot_income_advantage, None),
+    "resources_available": (plot_resources_available, "resources_available"),
+    "army_value": (plot_army_value, "army_value"),
+    "tech_value": (plot_tech_value, "tech_value"),
+    "supply": (plot_supply, "supply"),
+}
+
 # Helper Functions that woroks with replays
-def main(replay_bytes):
-    player_data = process_replay(replay_bytes)
-    figures = {
-        "collection_rates": plot_collection_rates(player_data),
-        "workers_active": plot_workers_active(player_data),
-        "income_advantage": plot_income_advantage(player_data),
-        "resources_available": plot_resources_available(player_data),
-        "army_value": plot_army_value(player_data),
-        "tech_value": plot_tech_value(player_data),
-        "supply": plot_supply(player_data)
+def build_figure(player_data, name, benchmark_index=None):
+    """Build a single analysis figure by name, for pages that render figures on demand."""
+    with metrics.span("figure"):
+        if name.startswith("unit_supply_"):
+            player_name = list(player_data)[int(name[len("unit_supply_"):])]
+            return plot_unit_supply(player_data, player_name)
+        plot, metric = FIGURES[name]
+        if metric is None:
+            return plot(player_data)
+        return plot(player_data, player_bands(benchmark_index, player_data)[metric])
+
+def figure_key(replay_keys, name, players, benchmark_index=None):
+    """cached_figure key: the replays and (tagged) players shown, plus what else shapes the figure."""
+    index_size = len(benchmark_index["replays"]) if benchmark_index else 0  # The index only grows
+    return (tuple(replay_keys), name, tuple(players), index_size, PARSER_VERSION)
+
+# Bump whenever the shape or content of player_data changes, so stale cache entries are ignored
+PARSER_VERSION = 4
+
+# sc2reader load options per parse mode, one per distinct load (each has its own cache keys).
+#   full:    sc2reader defaults (load_level=4, map not loaded, GameHeartNormalizer
+#            and ContextLoader engine plugins)
+#   tracker: tracker events only; the game events stream is never decoded, which
+#            does save time, but BasicCommandEvent is unavailable and production
+#            comes from tracker events alone
+PARSE_MODES = {
+    "full": {},
+    "tracker": {"load_level": 3, "load_map": False},
+}
+DEFAULT_PARSE_MODE = "full"
+_minimal_engine = GameEngine(plugins=[ContextLoader()])
+
+def cache_key(replay_bytes, mode=DEFAULT_PARSE_MODE):
+    """replay_cache key for a replay's parsed player_data."""
+    return f"{replay_hash(replay_bytes)}-v{PARSER_VERSION}-{mode}"
+
+def process_replay(replay_bytes, use_cache=True, mode=DEFAULT_PARSE_MODE, progress=None, profile=False):
+    """Parsed player_data for a replay, from the cache when possible.
+
+    With profile=True the replay is always parsed, and (player_data, profile) is
+    returned as from parse_events.
+    """
+    if mode not in PARSE_MODES:
+        raise ValueError(f"Unknown parse mode {mode!r}, expected one of {sorted(PARSE_MODES)}")
+    if profile:
+        player_data, stats = parse_replay(replay_bytes, mode, progress, profile=True)
+        if use_cache:
+            replay_cache.put(cache_key(replay_bytes, mode), player_data)
+        return player_data, stats
+    if not use_cache:
+        return parse_replay(replay_bytes, mode, progress)
+    key = cache_key(replay_bytes, mode)
+    player_data = replay_cache.get(key)
+    if player_data is None:
+        metrics.inc("sc2_replay_cache_misses_total")
+        player_data = parse_replay(replay_bytes, mode, progress)
+        replay_cache.put(key, player_data)
+    else:
+        metrics.inc("sc2_replay_cache_hits_total")
+    return player_data
+
+# Game seconds at which iter_process_replay yields partial player_data: an early-game
+# slice first, then progressively later ones
+STREAM_CHECKPOINTS = (4 * 60, 8 * 60, 12 * 60, 20 * 60, 30 * 60)
+
+def iter_process_replay(replay_bytes, checkpoints=STREAM_CHECKPOINTS, use_cache=True,
+                        mode=DEFAULT_PARSE_MODE, progress=None):
+    """process_replay as a generator of (checkpoint, player_data) pairs.
+
+    Yields a snapshot of everything parsed so far at each game-time checkpoint the
+    replay reaches, then (None, player_data) with the complete result. A cached replay
+    yields only the complete result. Snapshots share their arrays with later ones.
+    """
+    if mode not in PARSE_MODES:
+        raise ValueError(f"Unknown parse mode {mode!r}, expected one of {sorted(PARSE_MODES)}")
+    key = cache_key(replay_bytes, mode)
+    if use_cache:
+        player_data = replay_cache.get(key)
+        if player_data is not None:
+            metrics.inc("sc2_replay_cache_hits_total")
+            yield None, player_data
+            return
+        metrics.inc("sc2_replay_cache_misses_total")
+    try:
+        if progress:
+            progress("load")
+        with metrics.span("load"):
+            replay = load_replay(replay_bytes, mode)
+        if progress:
+            progress("parse")
+        # Parse time is summed between yields by hand, since a span around the loop
+        # would also count the time the caller spends on each snapshot
+        parse_seconds = 0.0
+        start = time.perf_counter()
+        player_data = initialize_data_structures(replay)
+        for checkpoint, snapshot in iter_parse_events(replay, player_data, sorted(checkpoints)):
+            parse_seconds += time.perf_counter() - start
+            if checkpoint is None:
+                metrics.observe("sc2_stage_seconds", parse_seconds, stage="parse")
+                record_parsed(replay)
+                if use_cache:
+                    replay_cache.put(key, snapshot)
+            yield checkpoint, snapshot
+            start = time.perf_counter()
+    except Exception:
+        metrics.inc("sc2_replay_failures_total")
+        raise
+
+# Worker pool for parsing several replays at once, created on first use in each
+# process (background callback jobs are forked and must not reuse the parent's pool)
+_parse_pool = None
+_parse_pool_pid = None
+
+def parse_pool():
+    global _parse_pool, _parse_pool_pid
+    if _parse_pool is None or _parse_pool_pid != os.getpid():
+        _parse_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        _parse_pool_pid = os.getpid()
+    return _parse_pool
+
+def process_replays(replays_bytes, use_cache=True, mode=DEFAULT_PARSE_MODE):
+    """Run process_replay on several replays concurrently, returning player_data in input order."""
+    parse = partial(process_replay, use_cache=use_cache, mode=mode)
+    if len(replays_bytes) <= 1:
+        return [parse(replay_bytes) for replay_bytes in replays_bytes]
+    return list(parse_pool().map(parse, replays_bytes))
+
+def load_replay(replay_bytes, mode=DEFAULT_PARSE_MODE):
+    """Load a replay with sc2reader, decoding only what the parse mode needs."""
+    options = PARSE_MODES[mode]
+    if options:
+        options = dict(options, engine=_minimal_engine)
+    return sc2reader.load_replay(io.BytesIO(replay_bytes), **options)
+
+def read_replay_metadata(replay_bytes):
+    """Read players, map, duration and version from the replay header, details and initData only."""
+    replay = sc2reader.load_replay(io.BytesIO(replay_bytes), load_level=1, load_map=False, engine=None)
+    replay.load_players()  # Built from the details/initData already read at load_level 1
+    return {
+        "players": [{"name": p.name, "race": p.play_race} for p in replay.players],
+        "map": replay.map_name,
+        "duration": replay.real_length.seconds,  # Real seconds
+        "game_version": replay.release_string,
     }
-    for i, player_name in enumerate(player_data.keys()):
-        figures[f"unit_supply_{i}"] = plot_unit_supply(player_data, player_name)
-    return figures
 
-def process_replay(replay_bytes):
-    replay = sc2reader.load_replay(io.BytesIO(replay_bytes))
-    player_data = initialize_data_structures(replay)
-    return parse_events(replay, player_data)
+def parse_replay(replay_bytes, mode=DEFAULT_PARSE_MODE, progress=None, profile=False):
+    try:
+        if progress:
+            progress("load")
+        with metrics.span("load"):
+            replay = load_replay(replay_bytes, mode)
+        if progress:
+            progress("parse")
+        with metrics.span("parse"):
+            player_data = initialize_data_structures(replay)
+            result = parse_events(replay, player_data, profile)
+    except Exception:
+        if not profile:
+            metrics.inc("sc2_replay_failures_total")
+        raise
+    # A profiled run re-parses a replay the analysis already parsed and counted
+    if not profile:
+        record_parsed(replay)
+    return result
+
+def record_parsed(replay):
+    """Count a successfully parsed replay and its events."""
+    metrics.inc("sc2_replays_parsed_total")
+    metrics.count_events(replay.events)
 
 # initialization 
 def initialize_data_structures(replay):
@@ -41,24 +217,13 @@ def initialize_data_structures(replay):
     player_data = {}
     for player in replay.players:
         player_data[player.name] = {
-            # Economy stats from PlayerStatsEvent (time in game seconds)
-            "times": [],
-            "minerals_collection_rate": [],
-            "minerals_current": [],
-            "minerals_used_current_army": [],
-            "minerals_used_current_economy": [],
-            "minerals_used_current_technology": [],
-            "vespene_collection_rate": [],
-            "vespene_current": [],
-            "vespene_used_current_army": [],
-            "vespene_used_current_economy": [],
-            "vespene_used_current_technology": [],
-            "army_value": [],
-            "workers_active_count": [],
-            "food_made": [],
-            "food_used": [],
-            # Unit investment tracking (time, supply_count)
-            "unit_investment": {unit: [(0, 0)] for unit in unit_list.keys()},
+            # Economy stats from PlayerStatsEvent (time in game seconds), frozen into
+            # column views ("times", "minerals_collection_rate", ...) by finalize_timelines
+            "timeline": PlayerTimeline(),
+            # Unit supply changes (time, unit id, supply delta), frozen into arrays by
+            # finalize_timelines; per-unit counts come from timeline.unit_supply_history
+            "unit_log": UnitLog(),
+            "race": player.play_race,
             # TODO: Placeholder for team affiliation (e.g., 1v1, 2v2)
             "team": None  # Will be set in future multi-player logic
         }
@@ -68,142 +233,253 @@ def initialize_data_structures(replay):
 
 
 # Helper Functions that woroks with events
-def get_player_name(event):
-    """Extract player name from an event, return None if not found."""
-    if hasattr(event, 'player') and event.player and hasattr(event.player, 'name'):
-        return str(event.player.name)
-    elif hasattr(event, 'unit') and hasattr(event.unit, 'owner') and event.unit.owner and hasattr(event.unit.owner, 'name'):
-        return str(event.unit.owner.name)
-    return None
+def event_player(event):
+    """Owning player of a stats or command event, or None."""
+    return getattr(event, "player", None)
+
+def unit_owner(event):
+    """Owning player of the unit a tracker unit event refers to, or None."""
+    unit = getattr(event, "unit", None)
+    return unit.owner if unit is not None else None
 
 
-# Handlers for different event types
-def handle_player_stats(event, player_data):
+# Handlers for different event types. Each receives the event, the per-player data
+# dicts in slot order and the integer slot of the player the event belongs to.
+def handle_player_stats(event, players, slot):
     """Extract economy stats from PlayerStatsEvent."""
-    player_name = get_player_name(event)
-    data = player_data[player_name]
-    time = event.second
-    data["times"].append(time)
-    data["minerals_collection_rate"].append(event.minerals_collection_rate)
-    data["minerals_current"].append(event.minerals_current)
-    data["minerals_used_current_army"].append(event.minerals_used_current_army)
-    data["minerals_used_current_economy"].append(event.minerals_used_current_economy)
-    data["minerals_used_current_technology"].append(event.minerals_used_current_technology)
-    data["vespene_collection_rate"].append(event.vespene_collection_rate)
-    data["vespene_current"].append(event.vespene_current)
-    data["vespene_used_current_army"].append(event.vespene_used_current_army)
-    data["vespene_used_current_economy"].append(event.vespene_used_current_economy)
-    data["vespene_used_current_technology"].append(event.vespene_used_current_technology)
-    data["army_value"].append(event.minerals_used_current_army + event.vespene_used_current_army)
-    data["workers_active_count"].append(event.workers_active_count)
-    data["food_made"].append(event.food_made)
-    data["food_used"].append(event.food_used)
-
-
-def update_unit_investment(player_data, player_name, unit_type, time, supply_change):
-    """Update supply investment for a unit type."""
-    if unit_type not in player_data[player_name]["unit_investment"]:
-        player_data[player_name]["unit_investment"][unit_type] = [(0, 0)]
-    investment = player_data[player_name]["unit_investment"][unit_type]
-    last_count = investment[-1][1]
-    new_count = max(0, last_count + supply_change)  # Ensure no negative supply
-    investment.append((time, new_count))
-
-def handle_basic_command(event, player_data, units_only):
+    players[slot]["timeline"].append((
+        event.second,
+        event.minerals_collection_rate,
+        event.minerals_current,
+        event.minerals_used_current_army,
+        event.minerals_used_current_economy,
+        event.minerals_used_current_technology,
+        event.vespene_collection_rate,
+        event.vespene_current,
+        event.vespene_used_current_army,
+        event.vespene_used_current_economy,
+        event.vespene_used_current_technology,
+        event.minerals_used_current_army + event.vespene_used_current_army,  # army_value
+        event.workers_active_count,
+        event.food_made,
+        event.food_used,
+    ))
+
+
+def update_unit_investment(data, unit_id, time, supply_change):
+    """Log a supply change for a unit type (clamped at zero when counts are computed)."""
+    data["unit_log"].append(time, unit_id, supply_change)
+
+# Ability name matcher, compiled once from morph_to_unit. Longest names first so
+# e.g. TrainMothershipCore is not resolved as TrainMothership.
+_morph_pattern = re.compile("|".join(
+    re.escape(morph) for morph in sorted(ability_unit_ids, key=len, reverse=True)
+))
+
+@lru_cache(maxsize=None)
+def ability_unit_id(ability):
+    """Resolve a command ability name to the unit id it produces, or None."""
+    unit_id = ability_unit_ids.get(ability)  # Exact match covers almost every command
+    if unit_id is None:
+        match = _morph_pattern.search(ability)
+        unit_id = ability_unit_ids[match.group()] if match else None
+    return unit_id
+
+# Units that merge into an Archon
+_archon_parts = frozenset((unit_ids["HighTemplar"], unit_ids["DarkTemplar"]))
+
+def handle_basic_command(event, players, slot):
     """Handle unit production start (birth trigger)."""
-    player_name = get_player_name(event)
-    if not player_name or player_name not in player_data:
-        return
-    ability = event.ability_name
-    for morph, unit_type in morph_to_unit.items():
-        if morph in ability and unit_type in units_only:
-            supply = costs.get(unit_type, (0, 0, 0))[2]  # Get supply cost (3rd element)
-            update_unit_investment(player_data, player_name, unit_type, event.second, supply)
-            break
+    unit_id = ability_unit_id(event.ability_name)
+    if unit_id is not None:
+        update_unit_investment(players[slot], unit_id, event.second, unit_supply[unit_id])
 
-def handle_unit_born(event, player_data, units_only):
+def handle_unit_born(event, players, slot):
     """Handle Zerg unit birth from eggs or natural spawns."""
-    player_name = get_player_name(event)
-    if not player_name or player_name not in player_data or not hasattr(event, 'unit_type_name'):
-        return
-    unit_type = event.unit_type_name
-    if unit_type in units_only:
-        supply = costs.get(unit_type, (0, 0, 0))[2]
-        update_unit_investment(player_data, player_name, unit_type, event.second, supply)
+    unit_id = unit_ids.get(event.unit_type_name)
+    if unit_id is not None:
+        update_unit_investment(players[slot], unit_id, event.second, unit_supply[unit_id])
 
-def handle_unit_type_change(event, player_data, units_only):
+def handle_unit_type_change(event, players, slot):
     """Handle unit transformations (potential death/birth)."""
-    player_name = get_player_name(event)
-    if not player_name or player_name not in player_data or not hasattr(event, 'unit_type_name'):
+    unit_id = unit_ids.get(event.unit.name)  # Original unit
+    if unit_id is None:
         return
-    old_unit = event.unit.name  # Original unit
     new_unit = event.unit_type_name  # New unit type after change
-    if "Egg" in new_unit and old_unit in units_only:  # e.g., Larva -> Egg (death of Larva)
-        supply = costs.get(old_unit, (0, 0, 0))[2]
-        update_unit_investment(player_data, player_name, old_unit, event.second, -supply)
-    elif old_unit in ["HighTemplar", "DarkTemplar"] and new_unit == "Archon":  # Merging into Archon
-        supply = costs.get(old_unit, (0, 0, 0))[2]
-        update_unit_investment(player_data, player_name, old_unit, event.second, -supply)
+    if "Egg" in new_unit:  # e.g., Larva -> Egg (death of Larva)
+        update_unit_investment(players[slot], unit_id, event.second, -unit_supply[unit_id])
+    elif unit_id in _archon_parts and new_unit == "Archon":  # Merging into Archon
+        update_unit_investment(players[slot], unit_id, event.second, -unit_supply[unit_id])
         # Archon birth handled separately if needed
 
-def handle_unit_init(event, player_data, units_only):
+def handle_unit_init(event, players, slot):
     """Handle non-Zerg unit/building start (birth trigger)."""
-    player_name = get_player_name(event)
-    if not player_name or player_name not in player_data or not hasattr(event, 'unit'):
-        return
-    unit_type = event.unit.name
-    if unit_type in units_only and event.unit.owner.play_race != "Zerg":  # Skip Zerg here
-        supply = costs.get(unit_type, (0, 0, 0))[2]
-        update_unit_investment(player_data, player_name, unit_type, event.second, supply)
+    unit_id = unit_ids.get(event.unit.name)
+    if unit_id is not None and event.unit.owner.play_race != "Zerg":  # Skip Zerg here
+        update_unit_investment(players[slot], unit_id, event.second, unit_supply[unit_id])
 
-def handle_unit_done(event, player_data, units_only):
+def handle_unit_done(event, players, slot):
     """Handle non-Zerg unit/building completion (optional confirmation)."""
     # Often redundant with BasicCommandEvent/UnitInitEvent, so we'll skip unless needed
     pass
 
-def handle_unit_died(event, player_data, units_only):
+def handle_unit_died(event, players, slot):
     """Handle unit death."""
-    player_name = get_player_name(event)
-    if not player_name or player_name not in player_data or not hasattr(event, 'unit'):
-        return
-    unit_type = event.unit.name
-    if unit_type in units_only:
-        supply = costs.get(unit_type, (0, 0, 0))[2]
-        update_unit_investment(player_data, player_name, unit_type, event.second, -supply)
+    unit_id = unit_ids.get(event.unit.name)
+    if unit_id is not None:
+        update_unit_investment(players[slot], unit_id, event.second, -unit_supply[unit_id])
 
-def handle_upgrade_complete(event, player_data, units_only):
+def handle_upgrade_complete(event, players, slot):
     """Handle upgrade completion (no supply impact, placeholder)."""
     pass  # Upgrades don’t affect unit supply, but we’ll keep it for future use
 
-# Event parsing
-def parse_events(replay, player_data):
-    """Parse replay events and extract relevant data."""
-    event_handlers = {
-        "PlayerStatsEvent": handle_player_stats,
-        "UpgradeCompleteEvent": handle_upgrade_complete,
-        "UnitBornEvent": handle_unit_born,
-        "UnitTypeChangeEvent": handle_unit_type_change,
-        "BasicCommandEvent": handle_basic_command,
-        "UnitInitEvent": handle_unit_init,
-        "UnitDoneEvent": handle_unit_done,
-        "UnitDiedEvent": handle_unit_died
+# Handler and player resolver per relevant event name
+event_handlers = {
+    "PlayerStatsEvent": (handle_player_stats, event_player),
+    "UpgradeCompleteEvent": (handle_upgrade_complete, event_player),
+    "UnitBornEvent": (handle_unit_born, unit_owner),
+    "UnitTypeChangeEvent": (handle_unit_type_change, unit_owner),
+    "BasicCommandEvent": (handle_basic_command, event_player),
+    "UnitInitEvent": (handle_unit_init, unit_owner),
+    "UnitDoneEvent": (handle_unit_done, unit_owner),
+    "UnitDiedEvent": (handle_unit_died, unit_owner),
+}
+
+# Dispatch table keyed by sc2reader event class, so each event costs one dict lookup.
+# Placeholder handlers are left out until they do something.
+event_dispatch = {
+    getattr(sc2reader.events, name): event_handlers[name]
+    for name in relevant_events
+    if event_handlers[name][0] not in (handle_unit_done, handle_upgrade_complete)
+}
+
+def finalize_timelines(player_data):
+    """Freeze each player's stats and unit log into arrays on player_data."""
+    for data in player_data.values():
+        data.update(data.pop("timeline").freeze().columns())
+        data["unit_log"] = data["unit_log"].freeze()
+
+def snapshot_timelines(player_data):
+    """Player data parsed so far, as array views; the timelines keep accumulating."""
+    return {
+        player_name: dict(
+            data["timeline"].snapshot(),
+            unit_log=data["unit_log"].snapshot(),
+            race=data["race"],
+            team=data["team"],
+        )
+        for player_name, data in player_data.items()
     }
-    
-    
-    for event in replay.events:
-        if event.name in relevant_events.keys():
-            handler = event_handlers[event.name]
-            if event.name == "PlayerStatsEvent":
-                handler(event, player_data)
-            else:  # PlayerStatsEvent, UpgradeCompleteEvent
-                handler(event, player_data, unit_list.keys())
-    
-    # Clean up unit_investment: remove units with no investment
-    for player_name in player_data:
-        investment = player_data[player_name]["unit_investment"]
-        # Keep only units where supply count ever exceeds 0
-        player_data[player_name]["unit_investment"] = {
-            unit_type: history for unit_type, history in investment.items()
-            if any(count > 0 for _, count in history)
-        }
+
+# Event parsing
+def parse_events(replay, player_data, profile=False):
+    """Parse replay events and extract relevant data.
+
+    With profile=True, returns (player_data, profile) as from profile_events instead.
+    """
+    if profile:
+        return profile_events(replay, player_data)
+    for _ in iter_parse_events(replay, player_data):
+        pass
     return player_data
+
+def player_slots(replay, player_data):
+    """Resolve players once: ({Player object: slot}, per-player data dicts in slot order)."""
+    players = []
+    slots = {}
+    for player in replay.players:
+        if player.name in player_data:
+            slots[player] = len(players)
+            players.append(player_data[player.name])
+    return slots, players
+
+def profile_events(replay, player_data):
+    """parse_events with per-handler timing, through timed copies of the handlers so normal parsing pays nothing.
+
+    Returns (player_data, profile). profile holds the event count, wall time and
+    events per second of the parse, per-handler calls, total and max seconds, and per
+    event type how many events were seen, dispatched to a handler, dropped (handled
+    type but no tracked owner) or unhandled (no handler for the type).
+    """
+    seen = Counter(map(type, replay.events))
+    dispatched = Counter()
+    handlers = {}  # Handler name -> [calls, total seconds, max seconds]
+    clock = time.perf_counter
+
+    def timed(cls, handler):
+        def run(event, players, slot):
+            handler_start = clock()
+            handler(event, players, slot)
+            elapsed = clock() - handler_start
+            dispatched[cls] += 1
+            stats = handlers.get(handler.__name__)
+            if stats is None:
+                stats = handlers[handler.__name__] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+        return run
+
+    dispatch = {cls: (timed(cls, handler), resolve) for cls, (handler, resolve) in event_dispatch.items()}
+    start = clock()
+    for _ in iter_parse_events(replay, player_data, dispatch=dispatch):
+        pass
+    seconds = clock() - start
+
+    events = sum(seen.values())
+    profile = {
+        "events": events,
+        "seconds": seconds,
+        "events_per_second": events / seconds if seconds else 0.0,
+        "handlers": {
+            name: {"calls": calls, "total_seconds": total, "max_seconds": longest}
+            for name, (calls, total, longest) in handlers.items()
+        },
+        "event_types": {
+            cls.__name__: {
+                "seen": count,
+                "dispatched": dispatched[cls],
+                "dropped": count - dispatched[cls] if cls in dispatch else 0,
+                "unhandled": 0 if cls in dispatch else count,
+            }
+            for cls, count in seen.most_common()
+        },
+    }
+    return player_data, profile
+
+def dispatch_events(events, dispatch, slots, players):
+    """Hand each event to its handler: one dict lookup rejects an unhandled event."""
+    for event in events:
+        entry = dispatch.get(event.__class__)
+        if entry is None:
+            continue
+        handler, resolve_player = entry
+        slot = slots.get(resolve_player(event))
+        if slot is not None:
+            handler(event, players, slot)
+
+def iter_parse_events(replay, player_data, checkpoints=(), dispatch=None):
+    """Generator form of parse_events.
+
+    Yields (checkpoint, snapshot) as the events pass each checkpoint (game seconds,
+    ascending), then (None, player_data) once every event is handled. dispatch
+    replaces event_dispatch, e.g. with timed or no-op handlers.
+    """
+    slots, players = player_slots(replay, player_data)
+    if dispatch is None:
+        dispatch = event_dispatch
+    events = replay.events  # sc2reader merges the event streams in frame order
+    start = 0
+    for checkpoint in checkpoints:
+        # The first event at or past the checkpoint is found by bisection, so the
+        # event loop itself never compares times
+        end = bisect_left(events, checkpoint, lo=start, key=attrgetter("second"))
+        if end == len(events):  # The game ends before this checkpoint
+            break
+        dispatch_events(events[start:end], dispatch, slots, players)
+        yield checkpoint, snapshot_timelines(player_data)
+        start = end
+    dispatch_events(events[start:] if start else events, dispatch, slots, players)
+
+    finalize_timelines(player_data)
+    yield None, player_data
@@ -0,0 +1,121 @@
+"""Bulk-ingest a folder of .SC2Replay files into the columnar replay store.
+
+    python -m tools.ingest REPLAY_DIR [--store DIR] [--workers N] [--mode MODE]
+
+Replays are parsed across a process pool. Files whose content hash is already
+in the store are skipped, and a replay that fails to parse, or even kills its
+worker process, is reported without stopping the run.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from tools.cache import replay_hash
+from tools.functions import DEFAULT_PARSE_MODE, PARSE_MODES, process_replay
+from tools.replay_store import STORE_DIR, has_replay, save_replay
+
+
+def find_replays(root):
+    """All .SC2Replay files under root, sorted for a stable order."""
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.lower().endswith(".sc2replay"):
+                paths.append(os.path.join(dirpath, filename))
+    return sorted(paths)
+
+
+def ingest_file(path, store_dir, mode=DEFAULT_PARSE_MODE):
+    """Parse one replay into the store. Returns (status, detail); runs in a worker process."""
+    try:
+        with open(path, "rb") as f:
+            replay_bytes = f.read()
+        key = replay_hash(replay_bytes)
+        if has_replay(store_dir, key):
+            return "skipped", key
+        player_data = process_replay(replay_bytes, use_cache=False, mode=mode)
+        save_replay(store_dir, key, player_data, source=os.path.basename(path))
+        return "ingested", key
+    except Exception as e:
+        return "failed", f"{type(e).__name__}: {e}"
+
+
+def ingest_batch(paths, store_dir, workers, mode, report):
+    """Ingest paths on a new pool, with at most workers files in flight, calling report(path, status, detail).
+
+    A worker process dying (e.g. out of memory) breaks the whole pool. Returns the
+    files in flight and the files not yet started at that point, or ([], []).
+    """
+    queue = deque(paths)
+    in_flight = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while queue or in_flight:
+            while queue and len(in_flight) < workers:
+                path = queue.popleft()
+                in_flight[executor.submit(ingest_file, path, store_dir, mode)] = path
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                try:
+                    status, detail = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    continue
+                except Exception as e:
+                    status, detail = "failed", f"{type(e).__name__}: {e}"
+                report(in_flight.pop(future), status, detail)
+            if broken:
+                return list(in_flight.values()), list(queue)
+    return [], []
+
+
+def ingest(root, store_dir=STORE_DIR, workers=None, mode=DEFAULT_PARSE_MODE, out=sys.stdout):
+    """Ingest every replay under root and return the per-status counts."""
+    paths = find_replays(root)
+    counts = {"ingested": 0, "skipped": 0, "failed": 0}
+    start = time.perf_counter()
+
+    def report(path, status, detail):
+        counts[status] += 1
+        done = sum(counts.values())
+        rate = done / (time.perf_counter() - start)
+        line = f"[{done}/{len(paths)}] {status:<8} {os.path.relpath(path, root)}  ({rate:.1f} replays/s)"
+        if status == "failed":
+            line += f"  {detail}"
+        print(line, file=out, flush=True)
+
+    pending = paths
+    while pending:
+        in_flight, pending = ingest_batch(pending, store_dir, workers or os.cpu_count(), mode, report)
+        # A worker died with these files in flight: retry each on its own, so only the
+        # file that kills its worker again is failed, then go on with the rest
+        for path in in_flight:
+            crashed, _ = ingest_batch([path], store_dir, 1, mode, report)
+            if crashed:
+                report(path, "failed", "worker process died")
+    elapsed = time.perf_counter() - start
+    print(
+        f"{counts['ingested']} ingested, {counts['skipped']} skipped, {counts['failed']} failed "
+        f"in {elapsed:.1f}s ({len(paths) / elapsed if elapsed else 0:.1f} replays/s)",
+        file=out,
+    )
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("replay_dir", help="Folder to scan recursively for .SC2Replay files")
+    parser.add_argument("--store", default=STORE_DIR, help="Replay store directory (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--mode", choices=sorted(PARSE_MODES), default=DEFAULT_PARSE_MODE, help="Parse mode")
+    args = parser.parse_args(argv)
+    counts = ingest(args.replay_dir, args.store, args.workers, args.mode)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Counters, histograms and timing spans, served at /metrics in Prometheus text format.
+
+Background callbacks and parse workers run in their own processes, so values live
+in a diskcache (SC2_METRICS_DIR) whose incr is atomic across processes. Peak
+memory per stage is traced with tracemalloc only when SC2_TRACE_MEMORY=1, since
+tracing slows every allocation down; it is process-wide, so concurrent requests
+in one process inflate each other's peaks.
+"""
+import os
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+import diskcache
+from flask import Response, g, request
+
+from tools.cache import CACHE_ROOT
+
+METRICS_DIR = os.environ.get("SC2_METRICS_DIR", os.path.join(CACHE_ROOT, "metrics"))
+TRACE_MEMORY = os.environ.get("SC2_TRACE_MEMORY") == "1"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = tuple(1 << shift for shift in range(20, 32, 2))  # 1 MiB to 1 GiB
+
+# Name -> (type, help text, histogram buckets)
+METRICS = {
+    "sc2_stage_seconds": ("histogram", "Wall time of each analysis stage", SECONDS_BUCKETS),
+    "sc2_stage_peak_bytes": ("histogram", "Peak traced memory of each analysis stage", BYTES_BUCKETS),
+    "sc2_request_seconds": ("histogram", "Wall time of Dash requests, including response serialization",
+                            SECONDS_BUCKETS),
+    "sc2_replays_parsed_total": ("counter", "Replays parsed by process_replay", None),
+    "sc2_replay_failures_total": ("counter", "Replays that failed to load or parse", None),
+    "sc2_replay_cache_hits_total": ("counter", "process_replay calls served from the replay cache", None),
+    "sc2_replay_cache_misses_total": ("counter", "process_replay calls that had to parse", None),
+    "sc2_events_total": ("counter", "Replay events seen by parse_events, by event type", None),
+}
+
+_store = diskcache.Cache(METRICS_DIR)
+_spans = threading.local()
+
+
+def inc(name, amount=1, **labels):
+    _store.incr((name, tuple(sorted(labels.items()))), amount)
+
+
+def observe(name, value, **labels):
+    """Add one observation to a histogram."""
+    buckets = METRICS[name][2]
+    key = (name, tuple(sorted(labels.items())))
+    bucket = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+    with _store.transact():
+        _store.incr(key + ("bucket", bucket))
+        _store.incr(key + ("sum",), value)
+
+
+def count_events(events):
+    """Add a replay's events to sc2_events_total, by event class."""
+    counts = Counter(map(type, events))
+    with _store.transact():
+        for cls, count in counts.items():
+            inc("sc2_events_total", count, type=cls.__name__)
+
+
+@contextmanager
+def span(stage):
+    """Time the enclosed block as one analysis stage (and trace its peak memory if enabled)."""
+    stack = getattr(_spans, "stack", None)
+    if stack is None:
+        stack = _spans.stack = []
+    if TRACE_MEMORY:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)  # reset_peak below would lose the parent's peak
+        tracemalloc.reset_peak()
+        stack.append([current, 0])
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("sc2_stage_seconds", time.perf_counter() - start, stage=stage)
+        if TRACE_MEMORY:
+            start_current, carried = stack.pop()
+            peak = max(carried, tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            observe("sc2_stage_peak_bytes", max(peak - start_current, 0), stage=stage)
+
+
+def _series(name, labels):
+    """Sample name with its labels, e.g. sc2_events_total{type="UnitBornEvent"}."""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{label}="{value}"' for label, value in labels) + "}"
+
+
+def render():
+    """All recorded metrics in Prometheus text exposition format."""
+    values = {}
+    for key in _store.iterkeys():
+        values[key] = _store.get(key, 0)
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        series = sorted({key[1] for key in values if key[0] == name})
+        for labels in series:
+            if kind == "counter":
+                lines.append(f"{_series(name, labels)} {values[(name, labels)]}")
+                continue
+            cumulative = 0
+            for i, bound in enumerate(buckets + (float("inf"),)):
+                cumulative += values.get((name, labels, "bucket", i), 0)
+                le = "+Inf" if bound == float("inf") else bound
+                lines.append(f"{_series(name + '_bucket', labels + (('le', le),))} {cumulative}")
+            lines.append(f"{_series(name + '_sum', labels)} {values.get((name, labels, 'sum'), 0)}")
+            lines.append(f"{_series(name + '_count', labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def register_metrics_route(server):
+    """Add GET /metrics and time every Dash callback request."""
+
+    @server.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @server.after_request
+    def record_request_time(response):
+        if request.path.endswith("/_dash-update-component") and "request_start" in g:
+            observe("sc2_request_seconds", time.perf_counter() - g.request_start, path="_dash-update-component")
+        return response
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
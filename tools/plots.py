@@ -1,34 +1,115 @@
+import json
+import os
+
+import numpy as np
 import plotly.graph_objects as go
 
-def game_to_real_minutes(game_seconds):
-    """Convert game seconds to real minutes using SC2's Faster speed factor."""
-    game_to_real_time = 0.714  # 1 game second = 0.714 real seconds
-    return [t * game_to_real_time / 60 for t in game_seconds]
+from tools import metrics
+from tools.cache import figure_cache
+from tools.resample import align_series, union_grid
+from tools.sc2_data import unit_colors, unit_names
+from tools.timeline import game_to_real_minutes, unit_supply_history
+
+# Figure encoding. With typed arrays, numeric trace data is sent as 32-bit binary
+# arrays (plotly's {"dtype", "bdata"} form) rather than JSON number lists. Line
+# traces with more than WEBGL_MIN_POINTS points are drawn with Scattergl. A stats
+# trace has one point per 10 game seconds (60 for a 10 minute game, 360 for an
+# hour), so the default puts games longer than 40 game minutes on WebGL.
+TYPED_ARRAYS = os.environ.get("SC2_TYPED_ARRAYS", "1") != "0"
+WEBGL_MIN_POINTS = int(os.environ.get("SC2_WEBGL_MIN_POINTS", "240"))
+
+
+def compact(values):
+    """Trace data in the configured encoding: a 32-bit array, or a plain list."""
+    values = np.asarray(values)
+    if not TYPED_ARRAYS:
+        return values.tolist()
+    if values.dtype.kind == "f":
+        return values.astype(np.float32, copy=False)
+    if values.dtype.kind in "iu":
+        return values.astype(np.int32, copy=False)
+    return values
+
+
+def line_trace(x, y, **kwargs):
+    """A line trace over compact x/y data, on WebGL when it has many points."""
+    trace_type = go.Scattergl if len(x) > WEBGL_MIN_POINTS else go.Scatter
+    return trace_type(x=compact(x), y=compact(y), **kwargs)
+
+
+def cached_figure(key, build):
+    """Figure dict for key from the figure cache, calling build() for a go.Figure on a miss."""
+    figure_json = figure_cache.get(key)
+    if figure_json is None:
+        figure = build()
+        with metrics.span("serialize"):
+            figure_json = figure.to_json()
+        figure_cache.put(key, figure_json)
+    return json.loads(figure_json)
+
+
+def add_percentile_band(fig, band, player_name):
+    """Overlay a corpus 25th-75th percentile band and median (from tools.aggregates.band)."""
+    fig.add_trace(
+        line_trace(
+            band["minutes"],
+            band["p75"],
+            mode="lines",
+            line=dict(width=0),
+            legendgroup=f"{player_name} - Corpus",
+            showlegend=False,
+            hoverinfo="skip",
+        )
+    )
+    fig.add_trace(
+        line_trace(
+            band["minutes"],
+            band["p25"],
+            name=f"{player_name} - Corpus 25-75%",
+            mode="lines",
+            line=dict(width=0),
+            fill="tonexty",
+            fillcolor="rgba(128, 128, 128, 0.2)",
+            legendgroup=f"{player_name} - Corpus",
+            hoverinfo="skip",
+        )
+    )
+    fig.add_trace(
+        line_trace(
+            band["minutes"],
+            band["p50"],
+            name=f"{player_name} - Corpus Median",
+            mode="lines",
+            line=dict(dash="dot", color="gray"),
+            legendgroup=f"{player_name} - Corpus",
+            hovertemplate="Corpus Median: %{y}",
+        )
+    )
 
 
 # Plotting Functions
-def plot_collection_rates(player_data):
+def plot_collection_rates(player_data, bands=None):
     """Plot resource collection rates over time per player."""
     fig = go.Figure()
     for player_name in player_data:
         times = game_to_real_minutes(player_data[player_name]["times"])
         minerals = player_data[player_name]["minerals_collection_rate"]
         vespene = player_data[player_name]["vespene_collection_rate"]
-        total = [m + v for m, v in zip(minerals, vespene)]
+        total = minerals + vespene
 
         fig.add_trace(
-            go.Scatter(
-                x=times,
-                y=total,
+            line_trace(
+                times,
+                total,
                 name=f"{player_name} - Total",
                 mode="lines",
                 hovertemplate="Total Rate: %{y} per min",
             )
         )
         fig.add_trace(
-            go.Scatter(
-                x=times,
-                y=minerals,
+            line_trace(
+                times,
+                minerals,
                 name=f"{player_name} - Minerals",
                 mode="lines",
                 line=dict(dash="dash"),
@@ -36,9 +117,9 @@ def plot_collection_rates(player_data):
             )
         )
         fig.add_trace(
-            go.Scatter(
-                x=times,
-                y=vespene,
+            line_trace(
+                times,
+                vespene,
                 name=f"{player_name} - Vespene",
                 mode="lines",
                 line=dict(dash="dash"),
@@ -46,6 +127,9 @@ def plot_collection_rates(player_data):
             )
         )
 
+    for player_name, band in (bands or {}).items():
+        add_percentile_band(fig, band, player_name)
+
     fig.update_layout(
         title="Resource Collection Rates Over Time",
         xaxis_title="Time (Real Minutes)",
@@ -59,7 +143,7 @@ def plot_collection_rates(player_data):
     return fig
 
 
-def plot_workers_active(player_data):
+def plot_workers_active(player_data, bands=None):
     """Plot workers active over time per player."""
     fig = go.Figure()
     for player_name in player_data:
@@ -67,15 +151,18 @@ def plot_workers_active(player_data):
         workers = player_data[player_name]["workers_active_count"]
 
         fig.add_trace(
-            go.Scatter(
-                x=times,
-                y=workers,
+            line_trace(
+                times,
+                workers,
                 name=f"{player_name}",
                 mode="lines",
                 hovertemplate="Workers: %{y}",
             )
         )
 
+    for player_name, band in (bands or {}).items():
+        add_percentile_band(fig, band, player_name)
+
     fig.update_layout(
         title="Workers Active Over Time",
         xaxis_title="Time (Real Minutes)",
@@ -98,39 +185,29 @@ def plot_income_advantage(player_data):
         return fig
     
     player1, player2 = list(player_data.keys())[:2]
-    
-    # Find the longest times list across all players
-    all_times = []
-    for player_name in player_data:
-        all_times.extend(player_data[player_name]["times"])
-    times = sorted(set(all_times))  # Unique, sorted times
+
+    # Forward-fill both players' total collection rate onto every sample time of every player
+    grid = union_grid(player_data[player_name]["times"] for player_name in player_data)
+    times, (p1_total, p2_total) = align_series(
+        [
+            (
+                player_data[player]["times"],
+                player_data[player]["minerals_collection_rate"] + player_data[player]["vespene_collection_rate"],
+            )
+            for player in (player1, player2)
+        ],
+        grid,
+    )
     real_times = game_to_real_minutes(times)
-    
-    # Interpolate collection rates for both players at all times
-    p1_total = []
-    p2_total = []
-    for player, p_total in [(player1, p1_total), (player2, p2_total)]:
-        player_times = player_data[player]["times"]
-        minerals = player_data[player]["minerals_collection_rate"]
-        vespene = player_data[player]["vespene_collection_rate"]
-        total = [m + v for m, v in zip(minerals, vespene)]
-        idx = 0
-        last_value = 0
-        for t in times:
-            while idx < len(player_times) - 1 and t >= player_times[idx + 1]:
-                idx += 1
-            if idx < len(player_times):
-                last_value = total[idx]
-            p_total.append(last_value)
-    
+
     # Calculate advantage
-    advantage = [p1 - p2 for p1, p2 in zip(p1_total, p2_total)]
-    
+    advantage = p1_total - p2_total
+
     fig = go.Figure()
     fig.add_trace(
-        go.Scatter(
-            x=real_times,
-            y=advantage,
+        line_trace(
+            real_times,
+            advantage,
             name=f"{player1} vs {player2}",
             mode="lines",
             hovertemplate="Time: %{x:.2f} min<br>Advantage: %{y} per min"
@@ -151,7 +228,7 @@ def plot_income_advantage(player_data):
     return fig
 
 
-def plot_resources_available(player_data):
+def plot_resources_available(player_data, bands=None):
     """Plot resources available over time per player."""
     fig = go.Figure()
     for player_name in player_data:
@@ -160,24 +237,27 @@ def plot_resources_available(player_data):
         vespene = player_data[player_name]["vespene_current"]
 
         fig.add_trace(
-            go.Scatter(
-                x=times,
-                y=minerals,
+            line_trace(
+                times,
+                minerals,
                 name=f"{player_name} - Minerals",
                 mode="lines",
                 hovertemplate="Minerals: %{y}",
             )
         )
         fig.add_trace(
-            go.Scatter(
-                x=times,
-                y=vespene,
+            line_trace(
+                times,
+                vespene,
                 name=f"{player_name} - Vespene",
                 mode="lines",
                 hovertemplate="Vespene: %{y}",
             )
         )
 
+    for player_name, band in (bands or {}).items():
+        add_percentile_band(fig, band, player_name)
+
     fig.update_layout(
         title="Resources Available Over Time",
         xaxis_title="Time (Real Minutes)",
@@ -191,7 +271,7 @@ def plot_resources_available(player_data):
     return fig
 
 
-def plot_army_value(player_data):
+def plot_army_value(player_data, bands=None):
     """Plot army value over time per player."""
     fig = go.Figure()
     for player_name in player_data:
@@ -199,15 +279,18 @@ def plot_army_value(player_data):
         army_value = player_data[player_name]["army_value"]
 
         fig.add_trace(
-            go.Scatter(
-                x=times,
-                y=army_value,
+            line_trace(
+                times,
+                army_value,
                 name=f"{player_name}",
                 mode="lines",
                 hovertemplate="Army Value: %{y}",
             )
         )
 
+    for player_name, band in (bands or {}).items():
+        add_percentile_band(fig, band, player_name)
+
     fig.update_layout(
         title="Army Value Over Time",
         xaxis_title="Time (Real Minutes)",
@@ -221,29 +304,29 @@ def plot_army_value(player_data):
     return fig
 
 
-def plot_tech_value(player_data):
+def plot_tech_value(player_data, bands=None):
     """Plot tech value over time per player."""
     fig = go.Figure()
     for player_name in player_data:
         times = game_to_real_minutes(player_data[player_name]["times"])
-        tech_value = [
-            m + v
-            for m, v in zip(
-                player_data[player_name]["minerals_used_current_technology"],
-                player_data[player_name]["vespene_used_current_technology"],
-            )
-        ]
+        tech_value = (
+            player_data[player_name]["minerals_used_current_technology"]
+            + player_data[player_name]["vespene_used_current_technology"]
+        )
 
         fig.add_trace(
-            go.Scatter(
-                x=times,
-                y=tech_value,
+            line_trace(
+                times,
+                tech_value,
                 name=f"{player_name}",
                 mode="lines",
                 hovertemplate="Tech Value: %{y}",
             )
         )
 
+    for player_name, band in (bands or {}).items():
+        add_percentile_band(fig, band, player_name)
+
     fig.update_layout(
         title="Upgrade Value Over Time",
         xaxis_title="Time (Real Minutes)",
@@ -256,7 +339,7 @@ def plot_tech_value(player_data):
     )
     return fig
 
-def plot_supply(player_data):
+def plot_supply(player_data, bands=None):
     """Plot tech value over time per player."""
     fig = go.Figure()
     for player_name in player_data:
@@ -265,9 +348,9 @@ def plot_supply(player_data):
         supply_available = player_data[player_name]["food_made"]
 
         fig.add_trace(
-            go.Scatter(
-                x=times,
-                y=supply_used,
+            line_trace(
+                times,
+                supply_used,
                 name=f"{player_name}",
                 mode="lines",
                 hovertemplate="Supply: %{y}",
@@ -275,9 +358,9 @@ def plot_supply(player_data):
         )
 
         fig.add_trace(
-            go.Scatter(
-                x=times,
-                y=supply_available,
+            line_trace(
+                times,
+                supply_available,
                 name=f"{player_name}",
                 mode="lines",
                 line=dict(dash="dash"),
@@ -285,6 +368,9 @@ def plot_supply(player_data):
             )
         )
 
+    for player_name, band in (bands or {}).items():
+        add_percentile_band(fig, band, player_name)
+
     fig.update_layout(
         title="Supply Over Time",
         xaxis_title="Time (Real Minutes)",
@@ -298,10 +384,20 @@ def plot_supply(player_data):
     return fig
 
 
-def plot_unit_supply(player_data, player_name):
-    """Plot stacked supply per unit type for a single player."""
-    from tools.sc2_data import unit_list  # Updated import
+def unit_supply_grid(player_data):
+    """Union of every player's unit investment times, the shared x axis of plot_unit_supply."""
+    return union_grid(
+        times
+        for data in player_data.values()
+        for times, _ in unit_supply_history(data["unit_log"]).values()
+    )
+
+
+def plot_unit_supply(player_data, player_name, grid=None):
+    """Plot stacked supply per unit type for a single player.
 
+    Pass grid (from unit_supply_grid) when plotting several players of the same data.
+    """
     if player_name not in player_data:
         fig = go.Figure()
         fig.add_annotation(text=f"No data for {player_name}", showarrow=False)
@@ -310,48 +406,32 @@ def plot_unit_supply(player_data, player_name):
 
     fig = go.Figure()
 
-    # Get all unique times across all players
-    all_times = set()
-    for p_name in player_data:
-        for unit_type, history in player_data[p_name]["unit_investment"].items():
-            all_times.update(t for t, _ in history)
-    times = sorted(all_times)
-    real_times = game_to_real_minutes(times)
+    if grid is None:
+        grid = unit_supply_grid(player_data)
+    real_times = game_to_real_minutes(grid)
 
+    histories = unit_supply_history(player_data[player_name]["unit_log"])
     # Get the last timestamp for this player
-    player_times = set()
-    for unit_type, history in player_data[player_name]["unit_investment"].items():
-        player_times.update(t for t, _ in history)
-    if player_times:
-        last_player_time = max(player_times)
-    else:
-        last_player_time = 0
-
-    # Plot each unit type for the specified player
-    for unit_type in player_data[player_name]["unit_investment"]:
-        if unit_type not in unit_list:
-            continue
-        history = player_data[player_name]["unit_investment"][unit_type]
-        supply_values = []
-        last_count = 0
-        history_idx = 0
-        for t in times:
-            if t > last_player_time:
-                supply_values.append(0)
-                continue
-            while history_idx < len(history) - 1 and t >= history[history_idx + 1][0]:
-                history_idx += 1
-            last_count = history[history_idx][1]
-            supply_values.append(last_count)
-
+    last_player_time = max((times[-1] for times, _ in histories.values()), default=0)
+
+    # Forward-fill every unit type onto the grid in one pass, zero after the player's last event
+    unit_ids = list(histories)
+    _, supply = align_series(list(histories.values()), grid)
+    supply[:, grid > last_player_time] = 0
+
+    # Plot each unit type for the specified player. Stacking is SVG-only, so these stay
+    # go.Scatter whatever their size; the shared x array is encoded once.
+    x = compact(real_times)
+    for unit_id, supply_values in zip(unit_ids, supply):
+        unit_type = unit_names[unit_id]
         fig.add_trace(
             go.Scatter(
-                x=real_times,
-                y=supply_values,
+                x=x,
+                y=compact(supply_values),
                 name=f"{unit_type}",
                 mode="lines",
                 stackgroup="supply",
-                line=dict(color=unit_list.get(unit_type, "gray"), width=0),  # Use unit_list directly
+                line=dict(color=unit_colors[unit_id], width=0),
                 hovertemplate=f"{unit_type}: %{{y}} supply<br>Time: %{{x:.2f}} min"
             )
         )
@@ -0,0 +1,68 @@
+import json
+import os
+
+import numpy as np
+
+from tools.cache import CACHE_ROOT
+from tools.timeline import STATS_FIELDS
+
+STORE_DIR = os.environ.get("SC2_STORE_DIR", os.path.join(CACHE_ROOT, "store"))
+
+# Columnar on-disk store of parsed replays: one compressed .npz per replay, named by
+# content hash. Each player's stats columns and unit log arrays are stored as
+# "p<slot>.<field>" entries, and names/races go in a JSON "meta" entry.
+UNIT_LOG_FIELDS = ("times", "unit_ids", "deltas")
+
+
+def replay_path(store_dir, key):
+    return os.path.join(store_dir, f"{key}.npz")
+
+
+def has_replay(store_dir, key):
+    """True if the replay with this content hash is already in the store."""
+    return os.path.exists(replay_path(store_dir, key))
+
+
+def save_replay(store_dir, key, player_data, source=None):
+    """Write one replay's timelines to the store, atomically."""
+    os.makedirs(store_dir, exist_ok=True)
+    arrays = {}
+    players = []
+    for slot, (player_name, data) in enumerate(player_data.items()):
+        players.append({"name": player_name, "race": data.get("race")})
+        for field in STATS_FIELDS:
+            arrays[f"p{slot}.{field}"] = np.ascontiguousarray(data[field])
+        for field in UNIT_LOG_FIELDS:
+            arrays[f"p{slot}.unit_log.{field}"] = data["unit_log"][field]
+    meta = {"key": key, "source": source, "players": players}
+    arrays["meta"] = np.array(json.dumps(meta))
+
+    path = replay_path(store_dir, key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_replay(store_dir, key, unit_log=True):
+    """Read a stored replay back as (meta, player_data), without the unit logs if unit_log is False."""
+    with np.load(replay_path(store_dir, key)) as npz:  # Entries are decompressed on access
+        meta = json.loads(str(npz["meta"]))
+        player_data = {}
+        for slot, player in enumerate(meta["players"]):
+            data = {field: npz[f"p{slot}.{field}"] for field in STATS_FIELDS}
+            if unit_log:
+                data["unit_log"] = {field: npz[f"p{slot}.unit_log.{field}"] for field in UNIT_LOG_FIELDS}
+            data["race"] = player["race"]
+            data["team"] = None
+            player_data[player["name"]] = data
+    return meta, player_data
+
+
+def iter_replays(store_dir, skip=(), unit_log=True):
+    """Yield (meta, player_data) for every replay in the store whose key is not in skip."""
+    if not os.path.isdir(store_dir):
+        return
+    for name in sorted(os.listdir(store_dir)):
+        if name.endswith(".npz") and name[:-len(".npz")] not in skip:
+            yield load_replay(store_dir, name[:-len(".npz")], unit_log)
@@ -0,0 +1,39 @@
+import numpy as np
+
+
+def union_grid(time_arrays):
+    """Sorted union of several time arrays, used as the common x axis."""
+    arrays = [np.asarray(times) for times in time_arrays if len(times)]
+    if not arrays:
+        return np.empty(0)
+    return np.unique(np.concatenate(arrays))
+
+
+def forward_fill(times, values, grid):
+    """Sample the step function (times, values) at every grid point.
+
+    Each grid point takes the value of the last sample at or before it; points before
+    the first sample take the first value. An empty series samples as zeros.
+    """
+    times = np.asarray(times)
+    values = np.asarray(values)
+    if len(times) == 0:
+        return np.zeros(len(grid), dtype=values.dtype if values.size else np.float64)
+    idx = np.searchsorted(times, grid, side="right") - 1
+    np.maximum(idx, 0, out=idx)
+    return values[idx]
+
+
+def align_series(series, grid=None):
+    """Align (times, values) series onto a common grid, the union of their times by default.
+
+    Returns the grid and a 2D array with one forward-filled row per series.
+    """
+    if grid is None:
+        grid = union_grid(times for times, _ in series)
+    else:
+        grid = np.asarray(grid)
+    aligned = np.zeros((len(series), len(grid)))
+    for row, (times, values) in enumerate(series):
+        aligned[row] = forward_fill(times, values, grid)
+    return grid, aligned
@@ -1,7 +1,10 @@
-# Costs dictionary for StarCraft II units, buildings, and upgrades
-# This dictionary contains the cost in minerals, gas, and supply for each unit, building, and upgrade.
-costs = {
-    # Terran Units
+import sys
+from array import array
+
+# Costs for StarCraft II units, buildings and upgrades, by category.
+# Units are (minerals, gas, supply); buildings and upgrades are (minerals, gas).
+unit_costs = {
+    # Terran
     "SCV": (50, 0, 1),
     "Marine": (50, 0, 1),
     "Marauder": (100, 25, 2),
@@ -21,7 +24,50 @@ costs = {
     "Raven": (100, 200, 2),
     "Battlecruiser": (400, 300, 6),
     "MULE": (0, 0, 0),
-    # Terran Buildings
+    # Protoss
+    "Probe": (50, 0, 1),
+    "Zealot": (100, 0, 2),
+    "Stalker": (125, 50, 2),
+    "Sentry": (50, 100, 2),
+    "Adept": (100, 25, 2),
+    "HighTemplar": (50, 150, 2),
+    "DarkTemplar": (125, 125, 2),
+    "Archon": (0, 0, 4),
+    "Observer": (25, 75, 1),
+    "WarpPrism": (200, 0, 2),
+    "Immortal": (250, 100, 4),
+    "Colossus": (300, 200, 6),
+    "Disruptor": (150, 150, 3),
+    "Phoenix": (150, 100, 2),
+    "VoidRay": (250, 150, 4),
+    "Oracle": (150, 150, 3),
+    "Carrier": (350, 250, 6),
+    "Tempest": (250, 175, 5),
+    "MothershipCore": (100, 100, 2),
+    "Mothership": (400, 400, 8),
+    # Zerg
+    "Larva": (0, 0, 0),
+    "Drone": (50, 0, 1),
+    "Overlord": (100, 0, 0),
+    "Overseer": (50, 100, 0),
+    "Queen": (150, 0, 2),
+    "Zergling": (25, 0, 0.5),
+    "Baneling": (25, 25, 0.5),
+    "Roach": (75, 25, 2),
+    "Ravager": (25, 75, 1),
+    "Hydralisk": (100, 50, 2),
+    "Lurker": (50, 100, 1),
+    "Infestor": (100, 150, 2),
+    "SwarmHost": (100, 75, 3),
+    "Ultralisk": (300, 200, 6),
+    "Mutalisk": (100, 100, 2),
+    "Corruptor": (150, 100, 2),
+    "Viper": (100, 200, 3),
+    "BroodLord": (150, 150, 2),
+}
+
+building_costs = {
+    # Terran
     "CommandCenter": (400, 0),
     "OrbitalCommand": (150, 0),
     "PlanetaryFortress": (150, 150),
@@ -43,7 +89,46 @@ costs = {
     "BarracksReactor": (50, 50),
     "FactoryReactor": (50, 50),
     "StarportReactor": (50, 50),
-    # Terran Upgrades
+    # Protoss
+    "Nexus": (400, 0),
+    "Pylon": (100, 0),
+    "Assimilator": (75, 0),
+    "Gateway": (150, 0),
+    "CyberneticsCore": (150, 0),
+    "Forge": (150, 0),
+    "PhotonCannon": (150, 0),
+    "ShieldBattery": (100, 0),
+    "TwilightCouncil": (150, 100),
+    "TemplarArchives": (150, 200),
+    "DarkShrine": (150, 150),
+    "RoboticsFacility": (200, 100),
+    "RoboticsBay": (150, 150),
+    "Stargate": (150, 150),
+    "FleetBeacon": (300, 200),
+    # Zerg
+    "Hatchery": (300, 0),
+    "Lair": (150, 100),
+    "Hive": (200, 150),
+    "Extractor": (25, 0),
+    "SpawningPool": (200, 0),
+    "EvolutionChamber": (75, 0),
+    "RoachWarren": (150, 0),
+    "BanelingNest": (100, 50),
+    "HydraliskDen": (100, 100),
+    "LurkerDen": (100, 150),
+    "InfestationPit": (100, 100),
+    "Spire": (200, 200),
+    "GreaterSpire": (100, 150),
+    "NydusNetwork": (150, 200),
+    "NydusWorm": (100, 100),
+    "UltraliskCavern": (150, 200),
+    "SpineCrawler": (100, 0),
+    "SporeCrawler": (75, 0),
+    "CreepTumor": (0, 0),
+}
+
+upgrade_costs = {
+    # Terran
     "TerranInfantryWeaponsLevel1": (100, 100),
     "TerranInfantryWeaponsLevel2": (175, 175),
     "TerranInfantryWeaponsLevel3": (250, 250),
@@ -75,44 +160,7 @@ costs = {
     "HyperflightRotors": (150, 150),
     "WeaponRefit": (150, 150),
     "NeosteelFrame": (100, 100),
-    # Protoss Units
-    "Probe": (50, 0, 1),
-    "Zealot": (100, 0, 2),
-    "Stalker": (125, 50, 2),
-    "Sentry": (50, 100, 2),
-    "Adept": (100, 25, 2),
-    "HighTemplar": (50, 150, 2),
-    "DarkTemplar": (125, 125, 2),
-    "Archon": (0, 0, 4),
-    "Observer": (25, 75, 1),
-    "WarpPrism": (200, 0, 2),
-    "Immortal": (250, 100, 4),
-    "Colossus": (300, 200, 6),
-    "Disruptor": (150, 150, 3),
-    "Phoenix": (150, 100, 2),
-    "VoidRay": (250, 150, 4),
-    "Oracle": (150, 150, 3),
-    "Carrier": (350, 250, 6),
-    "Tempest": (250, 175, 5),
-    "MothershipCore": (100, 100, 2),
-    "Mothership": (400, 400, 8),
-    # Protoss Buildings
-    "Nexus": (400, 0),
-    "Pylon": (100, 0),
-    "Assimilator": (75, 0),
-    "Gateway": (150, 0),
-    "CyberneticsCore": (150, 0),
-    "Forge": (150, 0),
-    "PhotonCannon": (150, 0),
-    "ShieldBattery": (100, 0),
-    "TwilightCouncil": (150, 100),
-    "TemplarArchives": (150, 200),
-    "DarkShrine": (150, 150),
-    "RoboticsFacility": (200, 100),
-    "RoboticsBay": (150, 150),
-    "Stargate": (150, 150),
-    "FleetBeacon": (300, 200),
-    # Protoss Upgrades
+    # Protoss
     "ProtossGroundWeaponsLevel1": (100, 100),
     "ProtossGroundWeaponsLevel2": (150, 150),
     "ProtossGroundWeaponsLevel3": (200, 200),
@@ -137,46 +185,7 @@ costs = {
     "ExtendedThermalLance": (150, 150),
     "AnionPulseCrystals": (150, 150),
     "FluxVanes": (100, 100),
-    # Zerg Units
-    "Larva": (0, 0, 0),
-    "Drone": (50, 0, 1),
-    "Overlord": (100, 0, 0),
-    "Overseer": (50, 100, 0),
-    "Queen": (150, 0, 2),
-    "Zergling": (25, 0, 0.5),
-    "Baneling": (25, 25, 0.5),
-    "Roach": (75, 25, 2),
-    "Ravager": (25, 75, 1),
-    "Hydralisk": (100, 50, 2),
-    "Lurker": (50, 100, 1),
-    "Infestor": (100, 150, 2),
-    "SwarmHost": (100, 75, 3),
-    "Ultralisk": (300, 200, 6),
-    "Mutalisk": (100, 100, 2),
-    "Corruptor": (150, 100, 2),
-    "Viper": (100, 200, 3),
-    "BroodLord": (150, 150, 2),
-    # Zerg Buildings
-    "Hatchery": (300, 0),
-    "Lair": (150, 100),
-    "Hive": (200, 150),
-    "Extractor": (25, 0),
-    "SpawningPool": (200, 0),
-    "EvolutionChamber": (75, 0),
-    "RoachWarren": (150, 0),
-    "BanelingNest": (100, 50),
-    "HydraliskDen": (100, 100),
-    "LurkerDen": (100, 150),
-    "InfestationPit": (100, 100),
-    "Spire": (200, 200),
-    "GreaterSpire": (100, 150),
-    "NydusNetwork": (150, 200),
-    "NydusWorm": (100, 100),
-    "UltraliskCavern": (150, 200),
-    "SpineCrawler": (100, 0),
-    "SporeCrawler": (75, 0),
-    "CreepTumor": (0, 0),
-    # Zerg Upgrades
+    # Zerg
     "ZergMeleeWeaponsLevel1": (100, 100),
     "ZergMeleeWeaponsLevel2": (150, 150),
     "ZergMeleeWeaponsLevel3": (200, 200),
@@ -208,6 +217,9 @@ costs = {
     "PneumatizedCarapace": (100, 100),
 }
 
+# Every entry in one dict
+costs = {**unit_costs, **building_costs, **upgrade_costs}
+
 # Define the morph_to_unit dictionary for mapping BasicCommandEvent abilities to unit names
 morph_to_unit = {
     # Zerg morph abilities
@@ -331,6 +343,25 @@ unit_list = {
     "BroodLord": "peachpuff",
 }
 
+# Compiled catalog: every unit, building and upgrade gets a dense integer id, units
+# first in unit_list order, so unit ids also index the unit supply delta log.
+# Per-id values live in parallel arrays; a name is hashed once to find its id.
+catalog_names = [
+    sys.intern(name) for name in (*unit_list, *building_costs, *upgrade_costs)
+]
+catalog_ids = {name: i for i, name in enumerate(catalog_names)}
+catalog_supply = array("d", (unit_costs.get(name, (0, 0, 0))[2] for name in catalog_names))
+catalog_colors = [unit_list.get(name, "gray") for name in catalog_names]
+
+# Unit ids are the first len(unit_list) catalog ids
+unit_names = catalog_names[:len(unit_list)]
+unit_ids = {name: catalog_ids[name] for name in unit_names}
+unit_supply = catalog_supply[:len(unit_list)]
+unit_colors = catalog_colors[:len(unit_list)]
+
+# Unit id produced by each morph_to_unit ability
+ability_unit_ids = {ability: unit_ids[unit] for ability, unit in morph_to_unit.items()}
+
 relevant_events = {
     "PlayerStatsEvent": {
         "notes": "Primary source for resource collection, spending, and worker counts (every 10s).",
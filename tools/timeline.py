@@ -0,0 +1,160 @@
+from array import array
+
+import numpy as np
+
+
+# Record layout for one PlayerStatsEvent sample (time in game seconds).
+# Field order matches the row tuples built by handle_player_stats.
+STATS_DTYPE = np.dtype([
+    ("times", np.int32),
+    ("minerals_collection_rate", np.int32),
+    ("minerals_current", np.int32),
+    ("minerals_used_current_army", np.int32),
+    ("minerals_used_current_economy", np.int32),
+    ("minerals_used_current_technology", np.int32),
+    ("vespene_collection_rate", np.int32),
+    ("vespene_current", np.int32),
+    ("vespene_used_current_army", np.int32),
+    ("vespene_used_current_economy", np.int32),
+    ("vespene_used_current_technology", np.int32),
+    ("army_value", np.int32),
+    ("workers_active_count", np.int32),
+    ("food_made", np.float32),  # Supply comes in half steps (e.g. Zerglings)
+    ("food_used", np.float32),
+])
+STATS_FIELDS = STATS_DTYPE.names
+
+
+def game_to_real_minutes(game_seconds):
+    """Convert game seconds to real minutes using SC2's Faster speed factor."""
+    game_to_real_time = 0.714  # 1 game second = 0.714 real seconds
+    return np.asarray(game_seconds, dtype=np.float64) * (game_to_real_time / 60)
+
+
+def _append(buffer, size, chunk):
+    """Write chunk after the first size items of buffer, growing it geometrically. Returns the buffer.
+
+    Items before size are never written again, so views handed out earlier stay valid.
+    """
+    if buffer is None:
+        return chunk
+    needed = size + len(chunk)
+    if needed > len(buffer):
+        grown = np.empty(max(needed, 2 * len(buffer)), dtype=buffer.dtype)
+        grown[:size] = buffer[:size]
+        buffer = grown
+    buffer[size:needed] = chunk
+    return buffer
+
+
+class PlayerTimeline:
+    """Per-player stats samples, buffered as row tuples while parsing and frozen into one record array."""
+
+    __slots__ = ("_rows", "_size", "records")
+
+    def __init__(self):
+        self._rows = []
+        self._size = 0
+        self.records = None
+
+    def append(self, row):
+        """Buffer one sample; row must follow STATS_DTYPE field order."""
+        self._rows.append(row)
+
+    def snapshot(self):
+        """Move rows buffered since the last snapshot into the record array and return column views so far."""
+        if self._rows or self.records is None:
+            chunk = np.array(self._rows, dtype=STATS_DTYPE)
+            self.records = _append(self.records, self._size, chunk)
+            self._size += len(chunk)
+            self._rows = []
+        return {field: self.records[field][:self._size] for field in STATS_FIELDS}
+
+    def freeze(self):
+        """Convert the buffered rows into a single contiguous record array in one bulk copy."""
+        self.snapshot()
+        self.records = self.records[:self._size]
+        return self
+
+    def __getitem__(self, field):
+        return self.records[field]  # Zero-copy column view
+
+    def __len__(self):
+        return self._size + len(self._rows)
+
+    def columns(self):
+        """Return every field as a zero-copy view into the record array."""
+        return {field: self.records[field] for field in STATS_FIELDS}
+
+
+class UnitLog:
+    """Append-only log of unit supply changes: parallel arrays of time, unit id and supply delta.
+
+    Unit ids index tools.sc2_data.unit_names. Deltas are float32 since some units
+    (e.g. Zerglings) cost half a supply.
+    """
+
+    __slots__ = ("times", "unit_ids", "deltas", "_snapshot", "_size")
+
+    def __init__(self):
+        self.times = array("i")
+        self.unit_ids = array("H")
+        self.deltas = array("f")
+        self._snapshot = None  # NumPy buffers of everything logged before the last snapshot
+        self._size = 0
+
+    def append(self, time, unit_id, delta):
+        self.times.append(time)
+        self.unit_ids.append(unit_id)
+        self.deltas.append(delta)
+
+    def _arrays(self):
+        return {
+            "times": np.frombuffer(self.times, dtype=np.int32),
+            "unit_ids": np.frombuffer(self.unit_ids, dtype=np.uint16),
+            "deltas": np.frombuffer(self.deltas, dtype=np.float32),
+        }
+
+    def snapshot(self):
+        """Move entries logged since the last snapshot into NumPy buffers and return views of the whole log."""
+        chunks = {field: chunk.copy() for field, chunk in self._arrays().items()}
+        count = len(self.times)
+        for log in (self.times, self.unit_ids, self.deltas):
+            del log[:]
+        if self._snapshot is None:
+            self._snapshot = chunks
+        else:
+            for field, chunk in chunks.items():
+                self._snapshot[field] = _append(self._snapshot[field], self._size, chunk)
+        self._size += count
+        return {field: buffer[:self._size] for field, buffer in self._snapshot.items()}
+
+    def freeze(self):
+        """Return the log as a dict of NumPy arrays sharing the logged buffers."""
+        if self._snapshot is None:
+            return self._arrays()
+        return self.snapshot()
+
+
+def unit_supply_history(unit_log):
+    """Per-unit-id (times, supply) step series from a frozen unit log.
+
+    Counts are the running sum of deltas clamped at zero, each series starts at
+    (0, 0), and unit types whose supply never goes above zero are left out.
+    """
+    times = np.asarray(unit_log["times"])
+    unit_ids = np.asarray(unit_log["unit_ids"])
+    deltas = np.asarray(unit_log["deltas"], dtype=np.float64)
+    order = np.argsort(unit_ids, kind="stable")  # Group by unit, keeping time order
+    ids, starts = np.unique(unit_ids[order], return_index=True)
+    history = {}
+    for unit_id, group in zip(ids, np.split(order, starts[1:])):
+        # Clamped running sum in one pass: count_n = sum_n - min(0, min_k<=n sum_k)
+        running = np.cumsum(deltas[group])
+        counts = running - np.minimum(np.minimum.accumulate(running), 0)
+        if counts.max() > 0:
+            history[int(unit_id)] = (
+                np.concatenate(([0], times[group])),
+                np.concatenate(([0.0], counts)),
+            )
+    return history
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from flask import abort, jsonify, request
+
+from tools import metrics
+from tools.cache import CACHE_ROOT, evict_lru
+
+# Replays uploaded through /upload are spooled here, named by content hash
+UPLOAD_DIR = os.environ.get("SC2_UPLOAD_DIR", os.path.join(CACHE_ROOT, "uploads"))
+MAX_UPLOAD_BYTES = int(os.environ.get("SC2_MAX_UPLOAD_MB", "64")) * 1024 * 1024
+# Spool size budget; the least recently read replays are deleted beyond it
+UPLOAD_SPOOL_BYTES = int(os.environ.get("SC2_UPLOAD_SPOOL_MB", "1024")) * 1024 * 1024
+
+_handle_pattern = re.compile(r"^[0-9a-f]{64}$")
+
+
+def upload_path(handle):
+    """Spool path for a replay handle, rejecting anything that is not a SHA-256 hex digest."""
+    if not isinstance(handle, str) or not _handle_pattern.match(handle):
+        raise ValueError(f"Invalid replay handle {handle!r}")
+    return os.path.join(UPLOAD_DIR, f"{handle}.SC2Replay")
+
+
+def spool_upload(stream, chunk_size=1 << 16):
+    """Stream an uploaded file to the spool directory and return its handle (content hash)."""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=".tmp", delete=False) as tmp:
+        try:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise ValueError(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+                hasher.update(chunk)
+                tmp.write(chunk)
+        except Exception:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    handle = hasher.hexdigest()
+    os.replace(tmp.name, upload_path(handle))  # Same bytes under the same name if already spooled
+    evict_uploads()
+    return handle
+
+
+def read_upload(handle):
+    """Return the bytes of a spooled replay."""
+    path = upload_path(handle)
+    with open(path, "rb") as f:
+        replay_bytes = f.read()
+    try:
+        os.utime(path)  # Bump mtime so eviction sees this upload as recently used
+    except OSError:  # Evicted since it was read
+        pass
+    return replay_bytes
+
+
+def evict_uploads(max_bytes=UPLOAD_SPOOL_BYTES):
+    """Delete the least recently used spooled replays until the spool fits in max_bytes."""
+    evict_lru(UPLOAD_DIR, ".SC2Replay", max_bytes)
+
+
+def register_upload_route(server):
+    """Add POST /upload, taking a multipart "replay" file and returning {"handle": ...}."""
+    # Let werkzeug refuse oversized bodies with 413 before buffering them (with room for
+    # the multipart headers); this bounds every request, Dash callbacks included
+    server.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + 64 * 1024
+
+    @server.route("/upload", methods=["POST"])
+    def upload_replay():
+        replay = request.files.get("replay")
+        if replay is None:
+            abort(400, "Missing 'replay' file field")
+        try:
+            with metrics.span("upload"):
+                handle = spool_upload(replay.stream)
+        except ValueError as e:
+            abort(413, str(e))
+        return jsonify({"handle": handle})
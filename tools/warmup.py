@@ -0,0 +1,46 @@
+"""Warm-up run once per process before it serves traffic.
+
+Pages import the parser and plot code inside their callbacks, so importing the
+app stays quick. warm_up() pays those deferred costs up front instead of the
+first request: importing sc2reader (which loads every build's datapack) and
+the parser, plus plotly's trace validators and figure encoding, which are
+only set up on the first figure built.
+"""
+import time
+from types import SimpleNamespace
+
+from tools import metrics
+
+WARMUP_PLAYER = "warm-up"
+
+
+def warmup_player_data():
+    """player_data for a one-player game of a few stats samples and one unit."""
+    from tools.functions import finalize_timelines, initialize_data_structures, update_unit_investment
+    from tools.timeline import STATS_FIELDS
+
+    replay = SimpleNamespace(players=[SimpleNamespace(name=WARMUP_PLAYER, play_race="Terran")])
+    player_data = initialize_data_structures(replay)
+    data = player_data[WARMUP_PLAYER]
+    for second in range(0, 60, 10):  # food_made and food_used are the last two fields
+        data["timeline"].append((second,) + (0,) * (len(STATS_FIELDS) - 3) + (15.0, 12.0))
+    update_unit_investment(data, 0, 0, 1)
+    finalize_timelines(player_data)
+    return player_data
+
+
+def warm_up():
+    """Import the parser and build and encode every analysis figure once. Returns the seconds taken."""
+    start = time.perf_counter()
+    with metrics.span("warmup"):
+        from tools.functions import FIGURES
+        from tools.plots import plot_unit_supply
+
+        # The plot functions are called directly rather than through build_figure, so
+        # warm-up figures stay out of the "figure" stage timings
+        player_data = warmup_player_data()
+        figures = [plot(player_data, {}) if metric else plot(player_data) for plot, metric in FIGURES.values()]
+        figures.append(plot_unit_supply(player_data, WARMUP_PLAYER))
+        for figure in figures:
+            figure.to_json()
+    return time.perf_counter() - start
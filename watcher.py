@@ -0,0 +1,205 @@
+"""Watch replay folders and parse new replays in the background.
+
+    python watcher.py [REPLAY_DIR ...] [--workers N] [--mode MODE] [--poll] [--interval S] [--settle S]
+
+Folders default to SC2_WATCH_DIRS (separated like PATH). A new or changed .SC2Replay
+file is handed to a worker pool once its size and mtime have held still for --settle
+seconds, so games still being written are not parsed early. Results land in the
+replay cache that process_replay reads, so the analyzer finds them already computed.
+
+File events come from inotify (through watchdog) when it is installed. Otherwise,
+or with --poll, the folders are rescanned every --interval seconds, which also
+works on network shares where inotify sees nothing.
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from tools.cache import replay_cache
+from tools.functions import DEFAULT_PARSE_MODE, PARSE_MODES, cache_key, process_replay
+from tools.ingest import find_replays
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Polling only
+    Observer = None
+
+WATCH_DIRS = [path for path in os.environ.get("SC2_WATCH_DIRS", "").split(os.pathsep) if path]
+# Times a replay is parsed again after its worker died before it is reported as failed.
+# A crash breaks the whole pool, so the other replays in flight are retried too.
+CRASH_RETRIES = 1
+
+
+def is_replay(path):
+    return path.lower().endswith(".sc2replay")
+
+
+def warm_replay(path, mode=DEFAULT_PARSE_MODE):
+    """Parse one replay into the replay cache. Returns (status, detail); runs in a worker process."""
+    try:
+        with open(path, "rb") as f:
+            replay_bytes = f.read()
+        if cache_key(replay_bytes, mode) in replay_cache:
+            return "cached", None
+        process_replay(replay_bytes, mode=mode)
+        return "parsed", None
+    except Exception as e:
+        return "failed", f"{type(e).__name__}: {e}"
+
+
+class PendingReplays:
+    """Replay files seen changing, released once their size and mtime stop changing."""
+
+    def __init__(self, settle):
+        self.settle = settle
+        self._pending = {}  # path -> ((size, mtime) at last check, time it last changed)
+        self._lock = threading.Lock()
+
+    def touch(self, path):
+        """Note that path was created or written to."""
+        with self._lock:
+            self._pending[path] = (None, time.monotonic())
+
+    def ready(self):
+        """Remove and return the files unchanged for at least settle seconds."""
+        now = time.monotonic()
+        settled = []
+        with self._lock:
+            for path, (signature, changed) in list(self._pending.items()):
+                try:
+                    st = os.stat(path)
+                except OSError:  # Deleted or renamed away before it settled
+                    del self._pending[path]
+                    continue
+                current = (st.st_size, st.st_mtime_ns)
+                if current != signature:
+                    self._pending[path] = (current, now)
+                elif now - changed >= self.settle:
+                    del self._pending[path]
+                    settled.append(path)
+        return settled
+
+
+def scan(dirs, known, pending):
+    """Mark replays that are new or changed since the last scan as pending."""
+    for root in dirs:
+        for path in find_replays(root):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            if known.get(path) != signature:
+                known[path] = signature
+                pending.touch(path)
+
+
+def start_observer(dirs, pending):
+    """Feed inotify events for replay files into pending. Returns the running watchdog observer."""
+
+    class ReplayEventHandler(FileSystemEventHandler):
+        def on_created(self, event):
+            if not event.is_directory and is_replay(event.src_path):
+                pending.touch(event.src_path)
+
+        on_modified = on_created
+
+        def on_moved(self, event):  # Files saved under a temporary name, then renamed
+            if not event.is_directory and is_replay(event.dest_path):
+                pending.touch(event.dest_path)
+
+    observer = Observer()
+    handler = ReplayEventHandler()
+    for root in dirs:
+        observer.schedule(handler, root, recursive=True)
+    observer.start()
+    return observer
+
+
+def report(path, out, pending, crashes, future):
+    try:
+        status, detail = future.result()
+    except BrokenProcessPool:  # A worker process died (e.g. out of memory)
+        crashes[path] = crashes.get(path, 0) + 1
+        if crashes[path] <= CRASH_RETRIES:
+            pending.touch(path)  # Parsed again on the new pool
+            return
+        status, detail = "failed", "worker process died"
+    except Exception as e:
+        status, detail = "failed", f"{type(e).__name__}: {e}"
+    crashes.pop(path, None)
+    line = f"{status:<8} {path}"
+    if detail:
+        line += f"  {detail}"
+    print(line, file=out, flush=True)
+
+
+def new_pool(workers=None):
+    # Workers ignore Ctrl-C; the main process handles it and shuts the pool down
+    return ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(), initializer=signal.signal, initargs=(signal.SIGINT, signal.SIG_IGN)
+    )
+
+
+def watch(dirs, workers=None, mode=DEFAULT_PARSE_MODE, poll=False, interval=1.0, settle=5.0, out=sys.stdout):
+    """Warm the replay cache with every replay under dirs, then with each new one, until interrupted."""
+    pending = PendingReplays(settle)
+    observer = None
+    if not poll and Observer is not None:
+        try:
+            observer = start_observer(dirs, pending)
+        except OSError as e:  # e.g. inotify watch limit reached
+            print(f"inotify unavailable ({e}), polling instead", file=out)
+    print(f"Watching {', '.join(dirs)} ({'inotify' if observer else 'polling'})", file=out, flush=True)
+
+    known = {}
+    crashes = {}  # path -> times its worker died
+    executor = new_pool(workers)
+    try:
+        scan(dirs, known, pending)  # Replays saved while the watcher was down
+        while True:
+            time.sleep(interval)
+            if observer is None:
+                scan(dirs, known, pending)
+            for path in pending.ready():
+                try:
+                    future = executor.submit(warm_replay, path, mode)
+                except BrokenProcessPool:  # A worker died since the last submit
+                    print("Worker process died, restarting the pool", file=out, flush=True)
+                    executor.shutdown(wait=False)
+                    executor = new_pool(workers)
+                    future = executor.submit(warm_replay, path, mode)
+                future.add_done_callback(partial(report, path, out, pending, crashes))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown(cancel_futures=True)
+        if observer is not None:
+            observer.stop()
+            observer.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("replay_dirs", nargs="*", default=WATCH_DIRS, help="Folders to watch (default: SC2_WATCH_DIRS)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--mode", choices=sorted(PARSE_MODES), default=DEFAULT_PARSE_MODE, help="Parse mode")
+    parser.add_argument("--poll", action="store_true", help="Rescan the folders instead of using inotify")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between checks (default: %(default)s)")
+    parser.add_argument("--settle", type=float, default=5.0,
+                        help="Seconds a file must stay unchanged before it is parsed (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if not args.replay_dirs:
+        parser.error("no replay folders given and SC2_WATCH_DIRS is not set")
+    watch(args.replay_dirs, args.workers, args.mode, args.poll, args.interval, args.settle)
+
+
+if __name__ == "__main__":
+    main()